@@ -1,96 +1,288 @@
 from __future__ import annotations
-import copy
-from typing import Any, Dict, Awaitable, Callable, Optional, List
+from typing import Any, AsyncIterator, Coroutine, Dict, List, Optional, Set, Tuple, Union
 from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.websockets import WebSocketState
 import asyncio
-import json
-import uuid
-import logging
-import threading
-import contextlib
-from helper import load_table
-from contextlib import redirect_stdout, redirect_stderr
-from autogluon_log_parser import parse_autogluon_log
-import sys
-import time
+import functools
+import struct
+import orjson
+import msgspec
 SUCCESS_MESSAGE = {"status": "success"}
+# WebSocket subprotocol a client can offer to get msgpack frames instead of JSON
+MSGPACK_SUBPROTOCOL = "msgpack"
+# frames (estimated, when encoding) above this size are encoded/decoded on a worker thread
+# so one big status/preview payload doesn't stall every other session on the loop; logs
+# and milestones stay far below it, where the thread hop would cost more than it saves
+OFFLOAD_CODEC_BYTES = 16 * 1024
+# separates records inside one framed log body (ASCII record separator)
+LOG_RECORD_SEP = "\x1e"
+# separates a record's timestamp from its text (ASCII unit separator)
+LOG_TS_SEP = "\x1f"
+
+def _json_default(obj: Any) -> Any:
+    """Fallback for types orjson can't serialize natively (numpy scalars/arrays, paths, sets)."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "item"):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "__fspath__"):
+        return obj.__fspath__()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def _size_hint(obj: Any, depth: int = 2) -> int:
+    """
+    Rough encoded size of obj from the lengths of its first `depth` levels; a list is
+    estimated from its first item. O(keys), no full traversal.
+    """
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    if isinstance(obj, dict):
+        if depth <= 0:
+            return 16 * len(obj)
+        return sum(8 + _size_hint(v, depth - 1) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        if not obj:
+            return 2
+        return len(obj) * max(8, _size_hint(obj[0], depth - 1) if depth > 0 else 16)
+    nbytes = getattr(obj, "nbytes", None)  # numpy arrays
+    return nbytes if isinstance(nbytes, int) else 8
+
+# JSON codec used for everything a session sends/receives (including framed log headers),
+# unless the client negotiated msgpack (see BaseSession.on_connect). orjson is a hard
+# requirement (job_index and the HTTP responses use it too).
+# Encode errors are TypeError/ValueError (orjson.JSONEncodeError subclasses TypeError).
+def _dumps(obj: Any) -> bytes:
+    # numpy arrays/scalars (dataset previews) are encoded natively; _json_default only
+    # sees what orjson can't take (e.g. non-contiguous arrays, object dtype)
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+# the same fallback hook as the JSON path (numpy etc. via .tolist()/.item())
+_msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=_json_default)
+# strict decoders for untyped sessions: the top-level map check happens inside decode
+_dict_json_decoder = msgspec.json.Decoder(dict)
+_dict_msgpack_decoder = msgspec.msgpack.Decoder(dict)
+
+# the plain ack is sent as-is for every successful action; encode it once per codec
+_SUCCESS_JSON = _dumps(SUCCESS_MESSAGE)
+_SUCCESS_MSGPACK = _msgpack_encoder.encode(SUCCESS_MESSAGE)
+
+@functools.lru_cache(maxsize=None)
+def _error_prefix(code: str, msgpack: bool = False) -> bytes:
+    """
+    Everything of an error envelope before the detail value, per code (a small fixed set):
+    '{"type":"error","code":<code>,"detail":' for JSON (the caller closes the brace), or a
+    3-entry msgpack map header and the same keys for msgpack (nothing to close).
+    """
+    if msgpack:
+        enc = _msgpack_encoder.encode
+        return b"\x83" + enc("type") + enc("error") + enc("code") + enc(code) + enc("detail")
+    return b'{"type":"error","code":' + _dumps(code) + b',"detail":'
+
+@functools.lru_cache(maxsize=None)
+def _typed_decoders(message_type: Any) -> Tuple[Any, Any]:
+    """(JSON, msgpack) decoders for a session's MESSAGE_TYPE, built once per type."""
+    return msgspec.json.Decoder(message_type), msgspec.msgpack.Decoder(message_type)
 
 # =========================
 # Base session wiring
 # =========================
 
 class BaseSession:
+    # msgspec type (e.g. a tagged Struct union) to decode + validate client messages into;
+    # None keeps plain dicts.
+    MESSAGE_TYPE: Any = None
+
     def __init__(self) -> None:
         self._ws: Optional[WebSocket] = None
+        # set by on_connect when the client negotiated MSGPACK_SUBPROTOCOL
+        self._msgpack: bool = False
+        # background tasks owned by this session (see spawn); cancelled when run_loop ends
+        self._tasks: Set[asyncio.Task] = set()
 
     async def run_loop(self, ws: WebSocket):
         """
         Lifecycle:
           1) on_connect(ws)
-          2) Loop: recv_json -> dispatch -> send_json
-          3) on_close(ws, exc)
+          2) Loop: for each frame from iter_json -> dispatch -> send_json
+          3) cancel tasks started via spawn(), then on_close(ws, exc)
         """
         exc: Optional[BaseException] = None
         await self.on_connect(ws)
         try:
-            while True:
-                try:
-                    msg: Dict[str, Any] = await self.recv_json(ws)
-                except WebSocketDisconnect as e:
-                    exc = e
-                    break
-                except asyncio.CancelledError as e:
-                    exc = e
-                    break
-                except Exception as e:
-                    await self.send_error(ws, f"bad message: {e}", code="bad_message")
+            # a disconnect (or cancellation) ends the loop from wherever it surfaces: one
+            # handler around the whole loop instead of a try/except per received frame
+            async for msg, err in self.iter_json(ws):
+                if err is not None:
+                    # malformed frames come back as a value, no exception on the hot path
+                    await self.send_error(ws, f"bad message: {err}", code="bad_message")
                     continue
 
                 try:
                     resp = await self.dispatch(msg)  # implemented by subclass
-                except WebSocketDisconnect as e:
-                    exc = e
-                    break
-                except asyncio.CancelledError as e:
-                    exc = e
-                    break
+                except (WebSocketDisconnect, asyncio.CancelledError):
+                    raise
                 except Exception as e:
                     await self.send_error(ws, f"server error: {e}", code="server_error")
                     continue
 
                 if resp is not None:
                     await self.send_json(ws, resp)
+        except (WebSocketDisconnect, asyncio.CancelledError) as e:
+            exc = e
         finally:
-            await self.on_close(ws, exc)
+            try:
+                await self._cancel_tasks()
+            finally:
+                await self.on_close(ws, exc)
+
+    async def iter_json(self, ws: WebSocket) -> AsyncIterator[Tuple[Optional[Any], Optional[str]]]:
+        """
+        Yields recv_json results until the client disconnects (like Starlette's iter_text,
+        but keeps binary frames). The WebSocketDisconnect propagates to the caller.
+        """
+        while True:
+            yield await self.recv_json(ws)
+
+    def spawn(self, coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        """Run coro as a task scoped to this session's lifetime (TaskGroup-style ownership)."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _cancel_tasks(self) -> None:
+        tasks = [t for t in self._tasks if not t.done()]
+        for t in tasks:
+            t.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     async def on_connect(self, ws: WebSocket):
         self._ws = ws
+        scope = getattr(ws, "scope", None) or {}
+        if MSGPACK_SUBPROTOCOL in (scope.get("subprotocols") or ()):
+            self._msgpack = True
+            await ws.accept(subprotocol=MSGPACK_SUBPROTOCOL)
+            return
         await ws.accept()
 
+    def client_gone(self, exc: BaseException) -> bool:
+        """True if exc (raised by a send) only means the client has gone away."""
+        if isinstance(exc, (WebSocketDisconnect, OSError)):
+            # OSError covers ConnectionError and uvicorn's ClientDisconnected
+            return True
+        if isinstance(exc, RuntimeError):
+            # Starlette raises a plain RuntimeError for a send once the socket is closed
+            states = (getattr(self._ws, "application_state", None), getattr(self._ws, "client_state", None))
+            return WebSocketState.DISCONNECTED in states
+        return False
+
     async def on_close(self, ws: WebSocket, exc: Optional[BaseException]): ...
     async def dispatch(self, msg: Dict[str, Any]) -> Optional[Dict[str, Any]]: ...
 
-    async def recv_json(self, ws: WebSocket) -> Dict[str, Any]:
-        raw = await ws.receive_text()
+    async def recv_json(self, ws: WebSocket) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Returns (msg, None) for a valid JSON object or (None, detail) for a malformed frame.
+        With MESSAGE_TYPE set, msg is an instance of it and a frame that doesn't fit the
+        schema counts as malformed. Only a disconnect raises (WebSocketDisconnect).
+        """
+        # Read the raw ASGI message so binary frames reach the decoder as bytes without a
+        # UTF-8 decode; text frames are handed over as str, which it parses directly.
+        message = await ws.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+        raw = message.get("bytes")
+        if raw is None:
+            raw = message.get("text") or ""
+        if len(raw) > OFFLOAD_CODEC_BYTES:
+            return await asyncio.to_thread(self._decode, raw)
+        return self._decode(raw)
+
+    def _decode(self, raw: Union[str, bytes]) -> Tuple[Optional[Any], Optional[str]]:
+        if self.MESSAGE_TYPE is not None:
+            return self._decode_typed(raw)
+        return self._decode_dict(raw)
+
+    def _decode_dict(self, raw: Union[str, bytes]) -> Tuple[Optional[Any], Optional[str]]:
+        # strict dict decoder: one C-level pass returns the top-level object or raises,
+        # no separate isinstance check afterwards
+        use_msgpack = self._msgpack and isinstance(raw, bytes)
+        try:
+            return (_dict_msgpack_decoder if use_msgpack else _dict_json_decoder).decode(raw), None
+        except msgspec.ValidationError:
+            return None, f"Expected top-level {'msgpack map' if use_msgpack else 'JSON object'} (dict)"
+        except msgspec.DecodeError as e:
+            return None, f"Invalid {'msgpack' if use_msgpack else 'JSON'} from client: {e}"
+
+    def _decode_typed(self, raw: Union[str, bytes]) -> Tuple[Optional[Any], Optional[str]]:
+        # decode and schema validation in one pass; binary frames on a msgpack session are
+        # msgpack, everything else JSON
+        json_dec, msgpack_dec = _typed_decoders(self.MESSAGE_TYPE)
+        use_msgpack = self._msgpack and isinstance(raw, bytes)
         try:
-            obj = json.loads(raw)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON from client: {e.msg}") from e
-        if not isinstance(obj, dict):
-            raise TypeError("Expected top-level JSON object (dict)")
-        return obj
+            return (msgpack_dec if use_msgpack else json_dec).decode(raw), None
+        except msgspec.ValidationError as e:
+            return self.invalid_message(raw, e)
+        except msgspec.DecodeError as e:
+            return None, f"Invalid {'msgpack' if use_msgpack else 'JSON'} from client: {e}"
+
+    def invalid_message(self, raw: Union[str, bytes], exc: Exception) -> Tuple[Optional[Any], Optional[str]]:
+        """A frame that parses but doesn't fit MESSAGE_TYPE; (None, detail) rejects it as bad_message."""
+        return None, f"Invalid message: {exc}"
+
+    def _encode(self, obj: Any) -> bytes:
+        # the session's wire codec: msgpack if negotiated, else compact UTF-8 JSON
+        if self._msgpack:
+            try:
+                return _msgpack_encoder.encode(obj)
+            except msgspec.EncodeError as e:
+                raise ValueError(str(e)) from e
+        return _dumps(obj)
 
     async def send_json(self, ws: WebSocket, payload: Dict[str, Any]) -> None:
+        if payload is SUCCESS_MESSAGE:
+            await ws.send_bytes(_SUCCESS_MSGPACK if self._msgpack else _SUCCESS_JSON)
+            return
+        # the codec emits bytes already; send them as-is to skip the str round-trip
         try:
-            text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+            if _size_hint(payload) > OFFLOAD_CODEC_BYTES:
+                data = await asyncio.to_thread(self._encode, payload)
+            else:
+                data = self._encode(payload)
         except (TypeError, ValueError) as e:
             raise ValueError(f"send_json payload not serializable: {e}") from e
-        await ws.send_text(text)
+        await ws.send_bytes(data)
+
+    async def send_framed(self, ws: WebSocket, header: Dict[str, Any], body: bytes) -> None:
+        """
+        Binary frame: [4-byte big-endian header length][JSON header][raw body bytes].
+        Network byte order keeps the first byte 0x00 for any sane header size, so clients
+        can tell these apart from plain JSON frames (which always start with '{') and from
+        msgpack ones (a map never starts with 0x00). The header uses the session's codec.
+        """
+        await ws.send_bytes(self.frame_header(header) + body)
+
+    async def send_log_batch(self, ws: WebSocket, prefix: bytes, blobs: List[str]) -> None:
+        """
+        Several text records in one frame: prefix (from frame_header) + blobs joined with
+        LOG_RECORD_SEP. A single record has no separator, i.e. a plain send_framed message.
+        """
+        await ws.send_bytes(prefix + LOG_RECORD_SEP.join(blobs).encode("utf-8"))
+
+    def frame_header(self, header: Dict[str, Any]) -> bytes:
+        """Length prefix + encoded header for send_framed; cache it when the header repeats."""
+        try:
+            hdr = self._encode(header)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"send_framed header not serializable: {e}") from e
+        return struct.pack("!I", len(hdr)) + hdr
 
     async def send_error(self, ws: WebSocket, detail: str, code: str = "bad_request") -> None:
-        payload: Dict[str, Any] = {
-            "type": "error",
-            "code": str(code),
-            "detail": str(detail),
-        }
-        await self.send_json(ws, payload)
\ No newline at end of file
+        # {"type": "error", "code": code, "detail": detail} without building the dict: cached
+        # envelope prefix per code, only the detail string is encoded
+        if self._msgpack:
+            await ws.send_bytes(_error_prefix(str(code), True) + _msgpack_encoder.encode(str(detail)))
+            return
+        await ws.send_bytes(_error_prefix(str(code)) + _dumps(str(detail)) + b"}")
\ No newline at end of file
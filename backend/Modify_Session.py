@@ -1,21 +1,6 @@
-# sessions.py
 from __future__ import annotations
-import copy
-from typing import Any, Dict, Awaitable, Callable, Optional, List
-from fastapi import WebSocket, WebSocketDisconnect
-import asyncio
-import json
-import uuid
-import logging
-import threading
-import contextlib
-from helper import load_table
-from contextlib import redirect_stdout, redirect_stderr
-from autogluon_log_parser import parse_autogluon_log
-import sys
-import time
+from typing import Any, Dict
 from Base_Session import BaseSession
-SUCCESS_MESSAGE = {"status": "success"}
 # =========================
 # ModifyDatasetSession (stubs)
 # =========================
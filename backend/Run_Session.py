@@ -1,136 +1,225 @@
 from __future__ import annotations
-import copy
-from typing import Any, Dict, Awaitable, Callable, Optional, List
-from fastapi import WebSocket, WebSocketDisconnect
+from typing import Any, Dict, Awaitable, Callable, Deque, Optional, List, Union
+from fastapi import WebSocket
+import msgspec
 import asyncio
-import json
-import uuid
+import secrets
+import itertools
+import functools
 import logging
+import logging.handlers
+import queue
+import collections
+import heapq
+import operator
 import threading
 import contextlib
-from helper import load_table
-from contextlib import redirect_stdout, redirect_stderr
-from autogluon_log_parser import parse_autogluon_log
-import sys
-import time
-from Base_Session import BaseSession
+import concurrent.futures
 import os
-import pickle
-from autogluon.tabular import TabularPredictor
-from autogluon.multimodal import MultiModalPredictor
-import torch
-NUM_GPUS = 0
-if torch.cuda.is_available():
-    NUM_GPUS = torch.cuda.device_count()
-print("num_gpus: ", NUM_GPUS)
-HISTORIC_JOBS_DIRECTORY = os.path.expanduser("~/.ood_automl")
-print(HISTORIC_JOBS_DIRECTORY)
-if not os.path.exists(HISTORIC_JOBS_DIRECTORY):
-    os.makedirs(HISTORIC_JOBS_DIRECTORY)
-HISTORIC_JOBS_FILE = HISTORIC_JOBS_DIRECTORY + "/runs_index.pkl"
-if not os.path.exists(HISTORIC_JOBS_FILE):
-    with open(HISTORIC_JOBS_FILE, 'wb+') as my_file:
-        pickle.dump({}, my_file)
-
-SUCCESS_MESSAGE = {"status": "success"}
-class _AsyncQueueLogHandler(logging.Handler):
-    """Logging handler that pushes log records into an asyncio.Queue from any thread."""
-    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, run_id: str):
-        super().__init__()
-        self.loop = loop
-        self.queue = queue
-        self.run_id = run_id
+from helper import load_table
+import job_index
+from Base_Session import BaseSession, SUCCESS_MESSAGE, LOG_TS_SEP
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=None)
+def _num_gpus() -> int:
+    # torch comes in with autogluon anyway; defer it until the first run needs it
+    import torch
+    num_gpus = torch.cuda.device_count() if torch.cuda.is_available() else 0
+    logger.debug("num_gpus: %d", num_gpus)
+    return num_gpus
+
+# run ids: random per-process prefix + monotonically increasing counter, so ids stay
+# unique across restarts without hitting os.urandom on every start
+_RUN_PREFIX = secrets.token_hex(8)
+_RUN_COUNTER = itertools.count()
+# log records kept for the streamer; when a client can't keep up the oldest are dropped
+# and the streamer reports how many with a {"type": "dropped", "count": N} event.
+# Structured events (state, milestones, finished/error) are never dropped.
+EVENT_BUFFER_MAX = 4096
+# most events handed to emit_batch in one call
+STREAM_BATCH_MAX = 256
+# rough cap (characters of message text) on one combined log frame; a burst of long
+# records (tracebacks, model summaries) is split rather than sent as one huge frame
+LOG_FRAME_MAX_CHARS = 64 * 1024
+# AutoGluon logs to these named loggers; the bridge handler is attached to them only (not
+# root), so records from the rest of the process (uvicorn, httpx, ...) never reach it
+_AUTOGLUON_LOGGERS = ("autogluon", "autogluon.tabular", "autogluon.multimodal", "autogluon.core")
+
+def _bridge_once(record: logging.LogRecord) -> bool:
+    """Handler filter: a record that propagates through several bridged loggers is sent once."""
+    if getattr(record, "_ood_automl_bridged", False):
+        return False
+    record._ood_automl_bridged = True
+    return True
+
+# levelno -> client level name, avoids a str.lower() per record
+_LEVEL_CACHE = {
+    logging.DEBUG: "debug",
+    logging.INFO: "info",
+    logging.WARNING: "warning",
+    logging.ERROR: "error",
+    logging.CRITICAL: "critical",
+}
+
+def _log_record_payload(record: logging.LogRecord, run_id: str) -> Dict[str, Any]:
+    return {
+        "run_id": run_id,
+        "type": "log",
+        "logger": record.name,
+        "level": _LEVEL_CACHE.get(record.levelno) or record.levelname.lower(),
+        # QueueHandler.prepare() already merged args (and appended any traceback); no
+        # asctime/name formatting, the client renders those from ts/logger
+        "msg": record.getMessage(),
+        "ts": record.created,
+    }
+
+def _forward_log_records(
+    records: "queue.SimpleQueue[Optional[logging.LogRecord]]",
+    push_many: Callable[[List[Dict[str, Any]]], None],
+    run_id: str,
+) -> None:
+    """
+    Listener thread for the QueueHandler bridge: block for one record, drain whatever
+    else is already waiting, and hand the whole batch to push_many (thread-safe) in one
+    call. A None record stops the listener.
+    """
+    while True:
+        batch = [records.get()]
+        while True:
+            try:
+                batch.append(records.get_nowait())
+            except queue.Empty:
+                break
+        payloads = [_log_record_payload(r, run_id) for r in batch if r is not None]
+        if payloads:
+            push_many(payloads)
+        if None in batch:
+            return
 
-    def emit(self, record: logging.LogRecord) -> None:
+def _drain(dq: Deque[tuple]) -> List[tuple]:
+    out = []
+    while True:
         try:
-            msg = self.format(record)
-        except Exception:
-            msg = record.getMessage()
-        payload = {
-            "run_id": self.run_id,
-            "type": "log",
-            "logger": record.name,
-            "level": record.levelname.lower(),
-            "msg": msg,
-        }
-        # safe from non-async threads
-        asyncio.run_coroutine_threadsafe(self.queue.put(payload), self.loop)
+            out.append(dq.popleft())
+        except IndexError:
+            return out
+
+_SEQ = operator.itemgetter(0)
+
+def _cfg_error(cfg: Dict[str, Any]) -> Optional[str]:
+    # Minimal validation for Tabular: require label and training data or path
+    if "label" not in cfg:
+        return "cfg.label is required"
+    if not (("train_df" in cfg) or ("train_data" in cfg) or ("train_path" in cfg)):
+        return "Provide training data via cfg.train_df/cfg.train_data/cfg.train_path"
+    return None
 
 class JobRunner:
     """
-    Executes AutoGluon training and streams progress/logs via an asyncio.Queue.
-    Single-run policy enforced (one run at a time).
+    Executes AutoGluon training and streams progress/logs via two deques of (seq, event):
+    a bounded one for log records and an unbounded one for the few structured events, so
+    a slow client only ever loses logs. Worker threads append directly (deque appends are
+    atomic) and only schedule a loop wakeup when none is pending; the wakeup sets the
+    asyncio.Event the consumer awaits, which merges both back into order by seq.
+    Single-run policy enforced (one run at a time); fit runs on a one-worker executor,
+    so the thread is reused across runs.
     """
     def __init__(self) -> None:
         self._active: bool = False
         self._run_id: Optional[str] = None
-        self._q: Optional[asyncio.Queue] = None
+        self._buf: Optional[Deque[tuple]] = None   # logs, bounded
+        self._ctl: Optional[Deque[tuple]] = None   # everything else
+        self._seq = itertools.count()
+        self._data_evt: Optional[asyncio.Event] = None
+        self._wake_pending: bool = False
+        self._dropped: int = 0
         self._loop: Optional[asyncio.AbstractEventLoop] = None
-        self._thread: Optional[threading.Thread] = None
-        self._stop_evt = threading.Event()
-        self._handler: Optional[_AsyncQueueLogHandler] = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="autogluon-fit")
+        self._future: Optional[asyncio.Future] = None
+        self._handler: Optional[logging.handlers.QueueHandler] = None
+        self._log_records: Optional[queue.SimpleQueue] = None
+        self._log_listener: Optional[threading.Thread] = None
         self._state: str = "idle"
         self._result_path: Optional[str] = None
         self._last_error: Optional[str] = None
         self._run_log_path: str = None;
+        self._ag_logger = logging.getLogger("autogluon")
+        self._ag_propagate: bool = True
 
     @property
     def is_running(self) -> bool:
         return self._active
 
     async def validate(self, cfg: Dict[str, Any]) -> tuple[bool, Optional[str]]:
-        # Minimal validation for Tabular: require label and training data or path
-        if "label" not in cfg:
-            return False, "cfg.label is required"
-        if not (("train_df" in cfg) or ("train_data" in cfg) or ("train_path" in cfg)):
-            return False, "Provide training data via cfg.train_df/cfg.train_data/cfg.train_path"
-        return True, None
+        err = _cfg_error(cfg)
+        return err is None, err
+
+    async def try_start(self, cfg: Dict[str, Any]) -> tuple[Optional[str], Optional[str]]:
+        """validate + start in one call: (run_id, None) on success, else (None, error)."""
+        if self._active:
+            return None, "a run is already in progress"
+        err = _cfg_error(cfg)
+        if err is not None:
+            return None, err
+        return self._start(cfg), None
 
     async def start(self, cfg: Dict[str, Any]) -> str:
         if self._active:
             raise RuntimeError("An AutoGluon run is already active")
+        return self._start(cfg)
+
+    def _start(self, cfg: Dict[str, Any]) -> str:
         self._active = True
         self._state = "starting"
-        self._stop_evt.clear()
         self._result_path = None
         self._last_error = None
 
-        self._run_id = uuid.uuid4().hex
+        self._run_id = f"{_RUN_PREFIX}{next(_RUN_COUNTER):08x}"
         self._loop = asyncio.get_running_loop()
-        self._q = asyncio.Queue()
-
-        # install logging bridge (root & autogluon)
-        self._handler = _AsyncQueueLogHandler(self._loop, self._q, self._run_id)
-        self._handler.setLevel(logging.INFO)
-        self._handler.setFormatter(logging.Formatter("%(asctime)s %(name)s: %(message)s"))
-
-        root = logging.getLogger()
-        root.addHandler(self._handler)
-        root.setLevel(min(root.level, logging.INFO) if root.level else logging.INFO)
-        logging.getLogger("autogluon").setLevel(logging.INFO)
-
-        self.logger = logging.getLogger("autogluon")
-        # kick off the training in a background thread
-        self._thread = threading.Thread(
-            target=self._train_entry, args=(cfg, self._run_id), daemon=True
+        self._buf = collections.deque(maxlen=EVENT_BUFFER_MAX)
+        self._ctl = collections.deque()
+        self._data_evt = asyncio.Event()
+        self._wake_pending = False
+        self._dropped = 0
+        self._run_log_path = None
+
+        # install logging bridge (autogluon loggers): records go into a SimpleQueue from
+        # the training thread and a single listener thread batches them onto self._buf
+        self._log_records = queue.SimpleQueue()
+        self._log_listener = threading.Thread(
+            target=_forward_log_records,
+            args=(self._log_records, self._push_many, self._run_id),
+            daemon=True,
         )
-        self._thread.start()
-
-        # announce start
-        await self._q.put({"run_id": self._run_id, "type": "state", "state": "running"})
+        self._log_listener.start()
+        self._handler = logging.handlers.QueueHandler(self._log_records)
+        self._handler.setLevel(logging.INFO)
+        self._handler.addFilter(_bridge_once)
+
+        self._ag_logger.setLevel(logging.INFO)
+        # the bridge already takes these records; don't also hand them to root's handlers
+        self._ag_propagate = self._ag_logger.propagate
+        self._ag_logger.propagate = False
+        for name in _AUTOGLUON_LOGGERS:
+            logging.getLogger(name).addHandler(self._handler)
+
+        self.logger = self._ag_logger
+        # announce start (before fit is submitted: it appends to the buffer directly)
+        self._push({"run_id": self._run_id, "type": "state", "state": "running"})
+
+        # kick off the training on the executor; _on_done ends the run on the loop thread
+        self._future = self._loop.run_in_executor(self._executor, self._train_entry, cfg, self._run_id)
+        self._future.add_done_callback(functools.partial(self._on_done, self._run_id))
         return self._run_id
 
     def write_to_mapping_file(self, path, cfg):
-        with open(HISTORIC_JOBS_FILE, "rb") as map_file:
-            current_job_id_mapping = pickle.load(map_file)
-
-        current_job_id_mapping[self._run_id] = {}
-        current_job_id_mapping[self._run_id]["file_path"] = path
-        current_job_id_mapping[self._run_id]["cfg"] = cfg
-        with open(HISTORIC_JOBS_FILE, "wb") as map_file:
-            pickle.dump(current_job_id_mapping, map_file)
+        job_index.add_job(self._run_id, path, cfg)
 
     def _train_entry(self, cfg: Dict[str, Any], run_id: str) -> None:
+        # keep the bridge pieces for cleanup even if a new run replaces them
+        handler, log_records, log_listener = self._handler, self._log_records, self._log_listener
         try:
             
 
@@ -156,13 +245,15 @@ class JobRunner:
             if not os.path.exists(path + "/logs"):
                 os.makedirs(path + "/logs")
             
-            print("made it here")
             self.write_to_mapping_file(path, cfg)
 
             open(self._run_log_path, 'w').close()
             predictor = None
 
+            # autogluon is imported lazily (only the flavour this run needs) so the server
+            # boots without paying for it
             if(data_type == "tabular"):
+                from autogluon.tabular import TabularPredictor
                 predictor = TabularPredictor(
                     label=label,
                     path=path,
@@ -171,6 +262,7 @@ class JobRunner:
                     log_file_path="auto"
                 )
             elif(data_type == "mm"):
+                from autogluon.multimodal import MultiModalPredictor
                 predictor = MultiModalPredictor(
                     label=label,
                     path=path,
@@ -181,36 +273,79 @@ class JobRunner:
 
             self._notify({"run_id": run_id, "type": "milestone", "stage": "fit_begin"})
 
+            num_gpus = _num_gpus()
             predictor.fit(
                 train_data=train_data,
                 tuning_data=tuning_data,
                 hyperparameters=hyperparameters,
                 presets=presets,
                 time_limit=time_limit,
-                num_gpus=NUM_GPUS,
-                ag_args_fit={'num_gpus': NUM_GPUS}
+                num_gpus=num_gpus,
+                ag_args_fit={'num_gpus': num_gpus}
             )
             self._result_path = predictor.path
             self._state = "finished"
             self._notify({"run_id": run_id, "type": "finished", "result_path": predictor.path})
-            self.__init__()
         except Exception as e:
             self._last_error = str(e)
             self._state = "error"
             self._notify({"run_id": run_id, "type": "error", "error": str(e)})
         finally:
-            self._active = False
-            # remove handler
-            if self._handler:
+            # remove handler and let the listener flush what it already has
+            if handler:
                 with contextlib.suppress(Exception):
-                    logging.getLogger().removeHandler(self._handler)
-            # final sentinel for streamers
-            self._notify({"run_id": run_id, "type": "eof"})
+                    for name in _AUTOGLUON_LOGGERS:
+                        logging.getLogger(name).removeHandler(handler)
+                self._ag_logger.propagate = self._ag_propagate
+            if log_records is not None and log_listener is not None:
+                log_records.put(None)
+                log_listener.join(5.0)
+
+    def _on_done(self, run_id: str, fut: asyncio.Future) -> None:
+        # event loop thread: the run only counts as over here, so a new start() can't
+        # swap the buffer before the final sentinel is queued
+        if not fut.cancelled() and fut.exception() is not None:
+            # _train_entry handles Exception itself; this is anything that got past it
+            self._last_error = repr(fut.exception())
+            self._state = "error"
+        self._active = False
+        # final sentinel for streamers
+        self._push({"run_id": run_id, "type": "eof"})
+
+    def _push(self, payload: Dict[str, Any]) -> None:
+        # event loop thread only
+        self._ctl.append((next(self._seq), payload))
+        self._data_evt.set()
+
+    def _push_many(self, payloads: List[Dict[str, Any]]) -> None:
+        """Thread-safe push of log records into the (bounded) log buffer."""
+        if self._loop and self._buf is not None:
+            # records the deque's maxlen is about to evict; approximate when producers
+            # race, which is fine for a counter that's only reported
+            over = len(self._buf) + len(payloads) - EVENT_BUFFER_MAX
+            if over > 0:
+                self._dropped += min(over, EVENT_BUFFER_MAX)
+            seq = self._seq
+            self._buf.extend([(next(seq), p) for p in payloads])
+            self._signal()
 
     def _notify(self, payload: Dict[str, Any]) -> None:
-        """Thread-safe push into the queue."""
-        if self._loop and self._q:
-            asyncio.run_coroutine_threadsafe(self._q.put(payload), self._loop)
+        """Thread-safe push of a structured event (never dropped)."""
+        if self._loop and self._ctl is not None:
+            self._ctl.append((next(self._seq), payload))
+            self._signal()
+
+    def _signal(self) -> None:
+        # one call_soon_threadsafe per burst, not per event: later producers see the flag
+        # and rely on the wakeup that's already scheduled (it clears the flag before
+        # setting the event, so nothing appended after the consumer's drain is missed)
+        if not self._wake_pending:
+            self._wake_pending = True
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        self._wake_pending = False
+        self._data_evt.set()
 
     async def pause(self, run_id: str) -> None:
         # Not supported for AutoGluon cleanly; you could implement cooperative checkpoints.
@@ -227,25 +362,6 @@ class JobRunner:
     async def restart(self, run_id: str) -> str:
         raise NotImplementedError("restart not supported")
 
-    def log_stream(self, stop_evt: threading.Event):
-        current_log_file = ""
-        while not stop_evt.is_set():
-            if(not (self._run_log_path is None)):
-                try:
-                    with open(self._run_log_path, "r") as file:
-                        log_file_contents = file.read()
-                except:
-                    continue
-                #parsed_log_file = parse_autogluon_log(log_file_contents)["models"]
-                if(len(log_file_contents) > len(current_log_file)):
-                    #diff = parsed_log_file[len(current_log_file):]
-                    diff = log_file_contents[len(current_log_file):]
-                    #item = {"type": "log", "msg": diff, "run_id": self._run_id}
-                    item = {"type": "log", "msg": diff, "run_id": self._run_id}
-                    current_log_file = log_file_contents
-                    self._notify(item)
-            time.sleep(0)
-
     async def status(self, run_id: str) -> Dict[str, Any]:
         return {
             "run_id": run_id,
@@ -258,39 +374,95 @@ class JobRunner:
     async def stream_progress(
         self,
         run_id: str,
-        emit: Callable[[Dict[str, Any]], Awaitable[None]]
+        emit: Callable[[Dict[str, Any]], Awaitable[None]],
+        emit_batch: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
     ) -> None:
-        """Drain internal queue and forward to the provided emitter until EOF."""
-        self._stop_evt.clear()
-        log_thread = threading.Thread(
-            target=self.log_stream, args=(self._stop_evt,), daemon=True
-        )
-        log_thread.start()
-        if not self._q:
+        """
+        Drain the internal event buffer and forward to the provided emitter until EOF.
+        Everything already buffered is drained per wakeup; when emit_batch is given the
+        whole batch is forwarded in one call instead of one emit per item.
+        """
+        buf, ctl, data_evt = self._buf, self._ctl, self._data_evt
+        if buf is None:
             return
-        try:
-            while True:
-                item = await self._q.get()
-                try:
-                    if item.get("type") == "eof":
-                        self._stop_evt.set()
-                        # don't forward EOF to client; it's internal
-                        return
-                    await emit(item)
-
-                finally:
-                    self._q.task_done()
-
-        except asyncio.CancelledError:
-            # If the coroutine is cancelled, also stop the log thread
-            self._stop_evt.set()
-            await asyncio.to_thread(log_thread.join, 5.0)
-            raise
+        while True:
+            await data_evt.wait()
+            data_evt.clear()
+            # popleft rather than list()+clear(): producer threads may append meanwhile
+            batch = _drain(ctl)
+            logs = _drain(buf)
+            if logs:
+                # both are already in seq order; merge instead of sorting
+                batch = list(heapq.merge(batch, logs, key=_SEQ)) if batch else logs
+
+            events: List[Dict[str, Any]] = []
+            dropped, self._dropped = self._dropped, 0
+            if dropped:
+                events.append({"run_id": run_id, "type": "dropped", "count": dropped})
+            eof = False
+            for _, item in batch:
+                if item.get("type") == "eof":
+                    # don't forward EOF to client; it's internal
+                    eof = True
+                elif not eof:
+                    events.append(item)
+
+            if events:
+                if emit_batch is not None:
+                    # bounded slices keep a single frame (and the client's render of it) small
+                    # after a long stall, e.g. a slow client catching up on a full buffer
+                    for i in range(0, len(events), STREAM_BATCH_MAX):
+                        await emit_batch(events[i:i + STREAM_BATCH_MAX])
+                else:
+                    for item in events:
+                        await emit(item)
+            if eof:
+                return
 
 # =========================
 # Run control session
 # =========================
 
+# client -> server messages; msgspec picks the type from the "action_type" tag and checks
+# the fields while decoding
+class StartMsg(msgspec.Struct, tag_field="action_type", tag="start"):
+    cfg: Dict[str, Any]
+
+class StatusMsg(msgspec.Struct, tag_field="action_type", tag="status"):
+    run_id: Optional[str] = None
+
+class CancelMsg(msgspec.Struct, tag_field="action_type", tag="cancel"):
+    run_id: Optional[str] = None
+
+ClientMessage = Union[StartMsg, StatusMsg, CancelMsg]
+# the action_type values the client may send; anything else gets the "unknown action_type" reply
+_ACTION_TAGS = frozenset(t.__struct_config__.tag for t in (StartMsg, StatusMsg, CancelMsg))
+
+def _known_action(msg: Dict[str, Any]) -> bool:
+    action = msg.get("action_type")
+    return isinstance(action, str) and action in _ACTION_TAGS
+
+def _envelope(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Normalize to a stable envelope for the client. stream_progress hands each payload
+    # over and never touches it again, so it's rewritten in place rather than merged
+    # into a new dict per event: two assignments, no pop/reinsert of "type". A payload
+    # that already carries its subtype has been enveloped and is left as is
+    if "subtype" not in payload:
+        payload["subtype"] = payload["type"]
+        payload["type"] = "event"
+    return payload
+
+def _log_key(payload: Dict[str, Any]) -> tuple:
+    return (payload.get("logger"), payload.get("level"))
+
+def _log_record(payload: Dict[str, Any]) -> str:
+    # "<ts>\x1f<msg>"; ts stays out of the header so the cached prefix still applies
+    ts = payload.get("ts")
+    msg = payload.get("msg") or ""
+    if ts is None:
+        return LOG_TS_SEP + msg
+    return f"{ts:.3f}{LOG_TS_SEP}{msg}"
+
 class RunControlSession(BaseSession):
     """
     Starts exactly one AutoGluon job at a time and streams updates/logs to the client.
@@ -299,66 +471,162 @@ class RunControlSession(BaseSession):
       {"type":"event","run_id":"...","subtype":"milestone","stage":"fit_begin"}
       {"type":"event","run_id":"...","subtype":"finished","result_path":"..."}
       {"type":"event","run_id":"...","subtype":"error","error":"..."}
+    Events that were queued together are sent as a single frame:
+      {"type":"event_batch","events":[{"type":"event",...}, ...]}
+    Log events skip JSON for the message text and use a binary frame (see send_framed):
+      [header length][{"type":"event","subtype":"log","run_id":"...",...}][ts 0x1F msg]
+    where ts is the record's epoch time in seconds (empty if unknown) and LOG_TS_SEP
+    (0x1F) separates it from the raw UTF-8 message. Consecutive log records with the same
+    header share one frame; records are joined with LOG_RECORD_SEP (0x1E) in the body, so
+    clients split the body on it, then each record on its first 0x1F.
     """
+    MESSAGE_TYPE = ClientMessage
+
     def __init__(self, job_runner: JobRunner):
         super().__init__()
         self.job_runner = job_runner
         self.runs: Dict[str, Any] = {}
         self.curr_run_id: Optional[str] = None
-        self._progress_task: Optional[asyncio.Task] = None
+        # run ids to stream, consumed by the session's single writer (see _run_writer)
+        self._stream_q: "asyncio.Queue[str]" = asyncio.Queue()
+        self._writer: Optional[asyncio.Task] = None
+        # framed log header bytes per (logger, level) for the run being streamed; run_id is
+        # fixed per stream and log payloads carry nothing else besides msg/ts (in the body),
+        # so the header only varies by these
+        self._log_headers: Dict[tuple, bytes] = {}
+
+    async def on_connect(self, ws: WebSocket):
+        await super().on_connect(ws)
+        # owned by the session: cancelled when the websocket loop exits (runs keep going)
+        self._writer = self.spawn(self._run_writer())
 
     async def on_close(self, ws: WebSocket, exc: Optional[BaseException]):
         # Allow the job to continue even if client disconnects; nothing special to do.
         # If you want to auto-cancel on disconnect, call self.job_runner.cancel here.
         pass
 
-    async def dispatch(self, msg: Dict[str, Any]) -> Dict[str, Any]:
-        action_type: str = msg.get("action_type", "")
-        if action_type == "start":
-            cfg = msg["cfg"]
-            return await self._handle_start(cfg)
-        elif action_type == "status":
-            rid = msg.get("run_id") or self.curr_run_id
-            if not rid:
-                return {"status": "error", "error": "no active run"}
-            return await self.status(rid)
-        elif action_type == "cancel":
-            rid = msg.get("run_id") or self.curr_run_id
-            if not rid:
-                return {"status": "error", "error": "no active run"}
-            return await self.cancel(rid)
-        else:
-            return {"status": "error", "error": f"unknown action_type={action_type}"}
+    async def dispatch(self, msg: Union[ClientMessage, Dict[str, Any]]) -> Dict[str, Any]:
+        if isinstance(msg, dict):
+            # an unknown/missing action_type (see _decode), or a direct caller passing a
+            # plain dict; known actions go through the same schema
+            if not _known_action(msg):
+                return {"status": "error", "error": f"unknown action_type={msg.get('action_type', '')}"}
+            try:
+                msg = msgspec.convert(msg, ClientMessage)
+            except msgspec.ValidationError as e:
+                return {"status": "error", "error": f"invalid message: {e}"}
+        return await self._HANDLERS[type(msg)](self, msg)
+
+    def _decode(self, raw: Union[str, bytes]):
+        # route on the action_type tag itself: an unknown/missing one stays a plain dict and
+        # gets dispatch's "unknown action_type" reply (as before messages were typed), a
+        # known one is checked against its Struct and rejected as bad_message if it doesn't fit
+        msg, err = self._decode_dict(raw)
+        if msg is None or not _known_action(msg):
+            return msg, err
+        try:
+            return msgspec.convert(msg, ClientMessage), None
+        except msgspec.ValidationError as e:
+            return self.invalid_message(raw, e)
+
+    async def _start_action(self, msg: StartMsg) -> Dict[str, Any]:
+        return await self._handle_start(msg.cfg)
+
+    async def _status_action(self, msg: StatusMsg) -> Dict[str, Any]:
+        rid = msg.run_id or self.curr_run_id
+        if not rid:
+            return {"status": "error", "error": "no active run"}
+        return await self.status(rid)
+
+    async def _cancel_action(self, msg: CancelMsg) -> Dict[str, Any]:
+        rid = msg.run_id or self.curr_run_id
+        if not rid:
+            return {"status": "error", "error": "no active run"}
+        return await self.cancel(rid)
 
     async def _handle_start(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
-        if self.job_runner.is_running:
-            return {"status": "error", "error": "a run is already in progress"}
-        ok, err = await self.job_runner.validate(cfg)
-        if not ok:
+        # check and start happen in one call with no await in between (try_start), so a
+        # concurrent start from another session can't slip in and is refused there
+        run_id, err = await self.job_runner.try_start(cfg)
+        if run_id is None:
             return {"status": "error", "error": err or "invalid cfg"}
-
-        run_id = await self.job_runner.start(cfg)
         self.curr_run_id = run_id
 
         # Stream progress/logs to the same websocket
-        assert self._ws is not None
-
-        async def emit(payload: Dict[str, Any]) -> None:
-            # Normalize to a stable envelope for the client
-            payload_without_type = copy.deepcopy(payload)
-            del payload_without_type["type"]
-            await self.send_json(self._ws, {"type": "event", "subtype": payload.get("type"), **payload_without_type})
-
-        async def _stream_and_cleanup():
-            with contextlib.suppress(Exception):
-                await self.job_runner.stream_progress(run_id, emit)
-            # When stream ends, clear active run
-            if self.curr_run_id == run_id:
-                self.curr_run_id = None
-
-        self._progress_task = asyncio.create_task(_stream_and_cleanup())
+        assert self._writer is not None, "on_connect starts the session writer"
+        self._stream_q.put_nowait(run_id)
         return {"status": "success", "run_id": run_id}
 
+    async def _run_writer(self) -> None:
+        """Session-lifetime writer: streams each started run to the websocket in turn."""
+        while True:
+            run_id = await self._stream_q.get()
+            self._log_headers.clear()
+            try:
+                await self.job_runner.stream_progress(run_id, self._emit, self._emit_batch)
+            except Exception as e:
+                if self.client_gone(e):
+                    # nothing more can be sent on this socket; the run itself keeps going
+                    logger.debug("client gone while streaming %s: %r", run_id, e)
+                    return
+                # a bug, not the client going away: surface it, but keep the writer alive
+                logger.exception("streaming run %s failed", run_id)
+            finally:
+                # When stream ends, clear active run
+                if self.curr_run_id == run_id:
+                    self.curr_run_id = None
+
+    async def _send_logs(self, payloads: List[Dict[str, Any]]) -> None:
+        # log text goes out raw behind a pre-encoded JSON header, no JSON escaping; a run
+        # of records sharing the same header is joined into one frame (send_log_batch)
+        key = _log_key(payloads[0])
+        prefix = self._log_headers.get(key)
+        if prefix is None:
+            # once per (logger, level): a copy, the records still need their msg/ts
+            header = {"type": "event", "subtype": "log"}
+            header.update((k, v) for k, v in payloads[0].items() if k not in ("type", "msg", "ts"))
+            prefix = self._log_headers[key] = self.frame_header(header)
+        await self.send_log_batch(self._ws, prefix, [_log_record(p) for p in payloads])
+
+    async def _emit(self, payload: Dict[str, Any]) -> None:
+        if payload.get("type") == "log":
+            await self._send_logs([payload])
+            return
+        await self.send_json(self._ws, _envelope(payload))
+
+    async def _send_events(self, payloads: List[Dict[str, Any]]) -> None:
+        if len(payloads) == 1:
+            await self._emit(payloads[0])
+            return
+        await self.send_json(self._ws, {"type": "event_batch", "events": [_envelope(p) for p in payloads]})
+
+    async def _emit_batch(self, payloads: List[Dict[str, Any]]) -> None:
+        # structured events are batched as JSON, logs use their own frames; keep order
+        pending: List[Dict[str, Any]] = []
+        logs: List[Dict[str, Any]] = []
+        log_chars = 0
+        for payload in payloads:
+            if payload.get("type") == "log":
+                if pending:
+                    await self._send_events(pending)
+                    pending = []
+                if logs and (_log_key(logs[0]) != _log_key(payload) or log_chars >= LOG_FRAME_MAX_CHARS):
+                    await self._send_logs(logs)
+                    logs = []
+                    log_chars = 0
+                logs.append(payload)
+                log_chars += len(payload.get("msg") or "")
+            else:
+                if logs:
+                    await self._send_logs(logs)
+                    logs = []
+                    log_chars = 0
+                pending.append(payload)
+        if logs:
+            await self._send_logs(logs)
+        if pending:
+            await self._send_events(pending)
+
     async def start(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
         # Not called directly; use dispatch("start")
         return await self._handle_start(cfg)
@@ -395,3 +663,10 @@ class RunControlSession(BaseSession):
     async def status(self, run_id: str) -> Dict[str, Any]:
         st = await self.job_runner.status(run_id)
         return {"status": "success", "run": st}
+
+    # message type -> handler, looked up once per client message in dispatch
+    _HANDLERS: Dict[type, Callable[["RunControlSession", Any], Awaitable[Dict[str, Any]]]] = {
+        StartMsg: _start_action,
+        StatusMsg: _status_action,
+        CancelMsg: _cancel_action,
+    }
@@ -2,18 +2,24 @@ from __future__ import annotations
 from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union, Literal
 import os
 from pathlib import Path
-from fastapi import FastAPI, WebSocket, APIRouter, HTTPException,  WebSocketDisconnect
-from fastapi.responses import JSONResponse
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi import FastAPI, WebSocket, APIRouter, HTTPException,  WebSocketDisconnect, Request
+from fastapi.responses import ORJSONResponse
+from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
 # Import your sessions + runner
 from Modify_Session import ModifyDatasetSession
-from Run_Session import JobRunner, RunControlSession, HISTORIC_JOBS_FILE
-import pickle
+from Run_Session import JobRunner, RunControlSession
+import job_index
+from helper import predict_proba_chunked, read_frame, write_frame
 import asyncio
+import gzip
+import threading
+import collections
+from collections import OrderedDict
 import anyio
 import pandas as pd
-from autogluon.tabular import TabularPredictor
 
 from pydantic import BaseModel, Field
 def _expand(p: str) -> str:
@@ -22,28 +28,68 @@ def _expand(p: str) -> str:
 class InferenceRequest(BaseModel):
     test_path: str = Field(..., description="Path to test data (CSV or Parquet)")
     job_id: str = Field(..., description="ID of the AutoGluon job")
-    output_path: str = Field(..., description="File path where predictions will be written (CSV)")
+    output_path: str = Field(..., description="File path where predictions will be written (CSV, or Parquet for .parquet)")
     proba: bool = Field(False, description="If true, write predict_proba instead of class labels")
 
 BASE_URL = os.getenv("BASE_URL", "")
 
-app = FastAPI(title="Run Controller API")
+async def _get_job_info(job_id: str) -> Dict[str, Any]:
+    # sqlite lookup by primary key, on a worker thread so the event loop isn't blocked
+    info = await anyio.to_thread.run_sync(job_index.get_job, job_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"unknown job_id: {job_id}")
+    return info
+
+# uvloop makes the queue drains / websocket sends on the event loop noticeably cheaper;
+# fall back to the stock asyncio loop where it isn't available (e.g. Windows)
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+# inotify-backed file watching for the /ws log tail; polling is the fallback
+try:
+    from watchfiles import awatch
+except ImportError:
+    awatch = None
+
+app = FastAPI(title="Run Controller API", default_response_class=ORJSONResponse)
+# compress HTTP bodies (job logs, job lists, JS/CSS); responses that already carry a
+# Content-Encoding (the pre-gzipped index.html) are passed through untouched
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 """
 prefix_router = APIRouter(prefix=BASE_URL)
 print("base url is: ", BASE_URL)
 app.include_router(prefix_router)
 """
+
+@app.on_event("startup")
+def _init_job_index():
+    # opens ~/.ood_automl/jobs.sqlite (or $OOD_AUTOML_HOME), migrating runs_index.pkl once
+    job_index.init_db()
+
+@app.on_event("startup")
+async def _enable_eager_tasks():
+    # Tasks like the progress streamer and short send/recv coroutines often finish
+    # without suspending; eager execution runs them inline instead of via the ready queue.
+    # asyncio.eager_task_factory only exists on Python 3.12+.
+    eager_task_factory = getattr(asyncio, "eager_task_factory", None)
+    if eager_task_factory is not None:
+        asyncio.get_running_loop().set_task_factory(eager_task_factory)
     
 
 # --------------------------------------------------------------------------------------
 # Shared singleton JobRunner (enforces at-most-one AutoGluon run across all connections)
 # --------------------------------------------------------------------------------------
+job_runner = JobRunner()
+
 # ============================== HTTP endpoints ==============================
 
 @app.get(BASE_URL + "/healthz")
 async def healthz():
-    return JSONResponse({"ok": True, "runner_active": job_runner.is_running})
+    return ORJSONResponse({"ok": True, "runner_active": job_runner.is_running})
 
 # (Optional) expose a super-minimal status endpoint if you have a run_id handy.
 # Typically, status is queried via the websocket "status" action, but you can
@@ -56,7 +102,6 @@ async def healthz():
 # async def ws_modify_dataset_endpoint(ws: WebSocket):
 #     await ModifyDatasetSession().run_loop(ws)
 
-job_runner = JobRunner()
 @app.websocket(BASE_URL + "/create_run")
 async def ws_run_endpoint(ws: WebSocket):
     # Each websocket gets its own session, but they all share the same job_runner
@@ -66,25 +111,41 @@ async def ws_run_endpoint(ws: WebSocket):
 @app.get(BASE_URL + "/running_job")
 async def get_running_jobs():
     if(job_runner.is_running):
-      return JSONResponse({"ok": True, "run_id": job_runner._run_id})
-    return JSONResponse({"ok": True, "run_id": ""})
+      return ORJSONResponse({"ok": True, "run_id": job_runner._run_id})
+    return ORJSONResponse({"ok": True, "run_id": ""})
 
 @app.get(BASE_URL + "/historic_jobs")
 async def get_historic_jobs():
-    print("got to historic jobs endpoint")
-    with open(HISTORIC_JOBS_FILE, "rb") as my_file:
-      job_id_mapping = pickle.load(my_file)
-    return JSONResponse({"ok": True, "job_ids": list(job_id_mapping.keys())})
+    job_ids = await anyio.to_thread.run_sync(job_index.list_job_ids)
+    return ORJSONResponse({"ok": True, "job_ids": job_ids})
+
+def _job_log_path(job_dir: str) -> str:
+    return os.path.join(job_dir, "logs", "predictor_log.txt")
 
 @app.get(BASE_URL + "/job/{job_id}")
 async def get_job(job_id: str):
-    with open(HISTORIC_JOBS_FILE, "rb") as my_file:
-      job_id_mapping = pickle.load(my_file)
-    file_path = job_id_mapping[job_id]["file_path"]
-    config = job_id_mapping[job_id]["cfg"]
-    with open(file_path, "r") as my_file:
-      log_file_content = my_file.read()
-    return JSONResponse({"ok": True, "job_id": job_id, "log_content": log_file_content, "cfg": config})
+    # metadata only; the (possibly multi-MB) log text is served by /job/{job_id}/log
+    info = await _get_job_info(job_id)
+    return ORJSONResponse({"ok": True, "job_id": job_id, "file_path": info["file_path"], "cfg": info["cfg"]})
+
+LOG_READ_CHUNK = 64 * 1024
+
+async def _iter_file(path: str):
+    async with await anyio.open_file(path, "rb") as f:
+        while True:
+            chunk = await f.read(LOG_READ_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+
+@app.get(BASE_URL + "/job/{job_id}/log")
+async def get_job_log(job_id: str):
+    info = await _get_job_info(job_id)
+    log_path = _job_log_path(info["file_path"])
+    if not os.path.isfile(log_path):
+        raise HTTPException(status_code=404, detail=f"log file not found: {log_path}")
+    # streamed in chunks: no full read into memory and no JSON escaping of the log text
+    return StreamingResponse(_iter_file(log_path), media_type="text/plain; charset=utf-8")
 
 def _locate_predictor_dir(job_dir: str) -> Optional[str]:
     """
@@ -106,59 +167,80 @@ def _locate_predictor_dir(job_dir: str) -> Optional[str]:
         if os.path.isfile(os.path.join(c, "learner.pkl")):
             return c
 
-    # 3) Search shallowly for learner.pkl (depth-limited)
+    # 3) Search shallowly for learner.pkl (depth-limited, breadth-first)
     max_depth = 3
-    base_parts = _expand(job_dir).rstrip(os.sep).split(os.sep)
-    for root, dirs, files in os.walk(job_dir):
-        depth = len(_expand(root).split(os.sep)) - len(base_parts)
-        if depth > max_depth:
-            # prune deeper traversal
-            dirs[:] = []
+    pending = collections.deque([(job_dir, 0)])
+    while pending:
+        d, depth = pending.popleft()
+        subdirs = []
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    if entry.name == "learner.pkl" and entry.is_file():
+                        return d
+                    if depth < max_depth and entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+        except OSError:
             continue
-        if "learner.pkl" in files:
-            return root
+        pending.extend((sub, depth + 1) for sub in subdirs)
     return None
 
 
-def _read_frame(path: str) -> pd.DataFrame:
-    if path.lower().endswith(".csv"):
-        return pd.read_csv(path)
-    if path.lower().endswith(".parquet"):
-        return pd.read_parquet(path)
-    # Default to CSV if extension unknown
-    return pd.read_csv(path)
+# Loaded predictors, most recently used last. Keyed by (dir, learner.pkl mtime) so a
+# retrained predictor in the same directory is loaded fresh.
+PREDICTOR_CACHE_MAX = 4
+_PREDICTOR_CACHE: "OrderedDict[Tuple[str, Optional[int]], Any]" = OrderedDict()
+_PREDICTOR_CACHE_LOCK = threading.Lock()
 
+def _load_predictor(predictor_dir: str):
+    try:
+        # imported on first use so server startup doesn't pay for autogluon
+        from autogluon.tabular import TabularPredictor
+    except ImportError:
+        raise RuntimeError("AutoGluon not installed. pip install autogluon.tabular")
 
-def _write_frame(df: pd.DataFrame, path: str) -> None:
-    parent = os.path.dirname(path)
-    if parent and not os.path.exists(parent):
-        os.makedirs(parent, exist_ok=True)
-    df.to_csv(path, index=False)
+    try:
+        mtime = os.stat(os.path.join(predictor_dir, "learner.pkl")).st_mtime_ns
+    except OSError:
+        mtime = None
+    key = (predictor_dir, mtime)
+    with _PREDICTOR_CACHE_LOCK:
+        predictor = _PREDICTOR_CACHE.get(key)
+        if predictor is not None:
+            _PREDICTOR_CACHE.move_to_end(key)
+            return predictor
+
+    # load outside the lock; it can take seconds for a large ensemble
+    predictor = TabularPredictor.load(predictor_dir)
+    with _PREDICTOR_CACHE_LOCK:
+        _PREDICTOR_CACHE[key] = predictor
+        _PREDICTOR_CACHE.move_to_end(key)
+        while len(_PREDICTOR_CACHE) > PREDICTOR_CACHE_MAX:
+            _PREDICTOR_CACHE.popitem(last=False)
+    return predictor
 
 
 def _predict_sync(predictor_dir: str, test_path: str, out_path: str, proba: bool) -> dict:
-    if TabularPredictor is None:
-        raise RuntimeError("AutoGluon not installed. pip install autogluon.tabular")
-
-    predictor = TabularPredictor.load(predictor_dir)
-    df = _read_frame(test_path)
+    predictor = _load_predictor(predictor_dir)
+    df = read_frame(test_path)
 
     if proba:
         # predict_proba returns DataFrame (multiclass) or Series (binary)
-        proba_out = predictor.predict_proba(df)
+        proba_out = predict_proba_chunked(predictor, df)
         if isinstance(proba_out, pd.Series):
             proba_out = proba_out.to_frame("proba")
-        proba_out.insert(0, "row", range(len(proba_out)))
-        _write_frame(proba_out, out_path)
+        # the row number is a RangeIndex written as the first column, not a materialized column
+        proba_out.index = pd.RangeIndex(len(proba_out), name="row")
+        write_frame(proba_out, out_path, index=True)
         n_rows = len(proba_out)
-        cols = list(proba_out.columns)
+        cols = ["row"] + list(proba_out.columns)
     else:
         preds = predictor.predict(df)
         out = pd.DataFrame({"prediction": preds})
-        out.insert(0, "row", range(len(out)))
-        _write_frame(out, out_path)
+        out.index = pd.RangeIndex(len(out), name="row")
+        write_frame(out, out_path, index=True)
         n_rows = len(out)
-        cols = list(out.columns)
+        cols = ["row"] + list(out.columns)
 
     return {"rows": n_rows, "columns": cols}
 
@@ -172,11 +254,8 @@ async def run_inference(req: InferenceRequest):
     if not os.path.exists(test_path):
         raise HTTPException(status_code=404, detail=f"test_path not found: {test_path}")
 
-    with open(HISTORIC_JOBS_FILE, "rb") as f:
-      job_map = pickle.load(f)
-    
     job_id = req.job_id
-    predictor_dir = job_map[job_id]["file_path"]
+    predictor_dir = (await _get_job_info(job_id))["file_path"]
     try:
         result = await anyio.to_thread.run_sync(
             _predict_sync, predictor_dir, test_path, out_path, req.proba
@@ -184,7 +263,7 @@ async def run_inference(req: InferenceRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Inference failed: {e}")
 
-    return JSONResponse(
+    return ORJSONResponse(
         {
             "ok": True,
             "job_id": req.job_id,
@@ -196,74 +275,168 @@ async def run_inference(req: InferenceRequest):
         }
     ) 
 
+# concurrent /ws log tails; connections past this are closed with 1013 (try again later)
+MAX_LOG_STREAMS = int(os.getenv("MAX_LOG_STREAMS", "128"))
+_STREAM_SEM = asyncio.Semaphore(MAX_LOG_STREAMS)
+
+# upper bound for one /ws text frame; new lines are sent in chunks instead of one frame per line
+WS_LOG_CHUNK = 64 * 1024
+
+def _read_new_lines_sync(fd: int, pos: int, size: int) -> Tuple[str, int]:
+    """Complete lines in fd between byte offset pos and size, and the offset to resume from."""
+    data = os.pread(fd, size - pos, pos)
+    # hold back a trailing partial line until its newline arrives
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return "", pos
+    return data[:end].decode("utf-8", errors="replace"), pos + end
+
+async def _wait_client_close(ws: WebSocket) -> None:
+    # the /ws stream is one-way; anything the client sends is ignored
+    while (await ws.receive())["type"] != "websocket.disconnect":
+        pass
+
 @app.websocket(BASE_URL + "/ws")
 async def ws_file_stream(ws: WebSocket, job_id: str):
     await ws.accept()
-    try:
-        # look up the job directory from the pickle
-        with open(HISTORIC_JOBS_FILE, "rb") as f:
-            job_map = pickle.load(f)
-
-        info = job_map.get(job_id)
-        if not info:
-            await ws.send_text("ERROR: unknown job_id")
-            await ws.close(code=1003)
-            return
-
-        job_dir = info["file_path"]
-        log_path = os.path.join(job_dir, "logs", "predictor_log.txt")
-
-        if not os.path.isfile(log_path):
-            await ws.send_text(f"ERROR: log file not found: {log_path}")
-            await ws.close(code=1003)
-            return
-
-        await ws.send_text(f"INFO: streaming {log_path}")
-
-        # stream the file (tail -f style): send lines as they appear
-        import aiofiles
-        async with aiofiles.open(log_path, "r") as f:
-            while True:
-                line = await f.readline()
-                if line:
-                    await ws.send_text(line)
-                else:
-                    await asyncio.sleep(0.5)
-
-    except WebSocketDisconnect:
+    if _STREAM_SEM.locked():
+        # at capacity: tell the client to retry later instead of piling up tailers
+        await ws.close(code=1013)
         return
-    except Exception as e:
+    async with _STREAM_SEM:
         try:
-            await ws.send_text(f"ERROR: {e}")
-        finally:
-            await ws.close(code=1011)
+            # look up the job directory in the job index
+            info = await anyio.to_thread.run_sync(job_index.get_job, job_id)
+            if not info:
+                await ws.send_text("ERROR: unknown job_id")
+                await ws.close(code=1003)
+                return
+
+            log_path = _job_log_path(info["file_path"])
+
+            if not os.path.isfile(log_path):
+                await ws.send_text(f"ERROR: log file not found: {log_path}")
+                await ws.close(code=1003)
+                return
+
+            await ws.send_text(f"INFO: streaming {log_path}")
+
+            # stream the file (tail -f style): send lines as they appear. The fd stays open
+            # for the connection; only an actual read is handed to a worker thread.
+            fd = os.open(log_path, os.O_RDONLY)
+            pos = 0
+
+            async def send_new_lines() -> None:
+                nonlocal fd, pos
+                try:
+                    if os.stat(log_path).st_ino != os.fstat(fd).st_ino:
+                        # rotated/recreated: follow the new file from the start. It's opened
+                        # before the old fd is closed, so if it vanishes in between the old
+                        # fd is kept and the check runs again on the next wakeup
+                        new_fd = os.open(log_path, os.O_RDONLY)
+                        os.close(fd)
+                        fd, pos = new_fd, 0
+                except FileNotFoundError:
+                    pass
+                size = os.fstat(fd).st_size
+                if size < pos:
+                    # truncated: start over
+                    pos = 0
+                if size == pos:
+                    return
+                text, pos = await anyio.to_thread.run_sync(_read_new_lines_sync, fd, pos, size)
+                # everything written since the last wakeup goes out in as few frames as possible,
+                # split on line boundaries at WS_LOG_CHUNK
+                while len(text) > WS_LOG_CHUNK:
+                    cut = text.rfind("\n", 0, WS_LOG_CHUNK) + 1 or text.find("\n", WS_LOG_CHUNK) + 1 or len(text)
+                    await ws.send_text(text[:cut])
+                    text = text[cut:]
+                if text:
+                    await ws.send_text(text)
+
+            async def tail() -> None:
+                await send_new_lines()
+                if awatch is None:
+                    while True:
+                        await asyncio.sleep(0.5)
+                        await send_new_lines()
+                # only wake up when the kernel reports a change; the 5s timeout tick re-checks the
+                # file anyway so a rotated/recreated log is still picked up
+                async for _changes in awatch(log_path, rust_timeout=5000, yield_on_timeout=True):
+                    await send_new_lines()
+
+            # a quiet log never sends, so watch for the client going away as well; otherwise a
+            # closed connection would hold its _STREAM_SEM slot until the next write
+            tail_task = asyncio.ensure_future(tail())
+            closed_task = asyncio.ensure_future(_wait_client_close(ws))
+            try:
+                done, pending = await asyncio.wait({tail_task, closed_task}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for t in (tail_task, closed_task):
+                    t.cancel()
+                await asyncio.gather(tail_task, closed_task, return_exceptions=True)
+                os.close(fd)
+            if tail_task in done:
+                tail_task.result()
+
+        except WebSocketDisconnect:
+            return
+        except Exception as e:
+            try:
+                await ws.send_text(f"ERROR: {e}")
+            finally:
+                await ws.close(code=1011)
 
 
 # frontend rendering
 # --- Static site (Vue build) ---
 DIST_DIR = (Path(__file__).parent.parent / "frontend" / "run-client" / "dist").resolve()
 
-# Serve built assets (JS/CSS/images)
-app.mount("/assets", StaticFiles(directory=DIST_DIR / "assets"), name="assets")
-
-# Serve index.html at root
-@app.get(BASE_URL + "/", response_class=HTMLResponse)
-async def index():
-  return FileResponse(DIST_DIR / "index.html")
-
-# SPA fallback for client-side routes (but don’t shadow your API)
-@app.get(BASE_URL + "/{path:path}", response_class=HTMLResponse)
-async def spa_fallback(path: str):
-  # Let API/websocket/static paths 404 normally
-  print(path)
-  if path.startswith(("healthz", "create_run")):
-    raise HTTPException(status_code=404)
-  path = "/" + path
-  dist_dir = DIST_DIR / path.lstrip("/")
-  print(dist_dir)
-  return FileResponse(dist_dir)
+# index.html is tiny and only changes on a frontend rebuild (which restarts the server),
+# so keep it in memory, plain and gzipped, instead of stat+read per SPA navigation
+_INDEX_BYTES = (DIST_DIR / "index.html").read_bytes()
+_INDEX_GZ = gzip.compress(_INDEX_BYTES, 6)
+
+def _index_response(request: Request) -> Response:
+  headers = {"cache-control": "no-cache", "vary": "Accept-Encoding"}
+  if "gzip" in request.headers.get("accept-encoding", ""):
+    headers["content-encoding"] = "gzip"
+    return Response(_INDEX_GZ, media_type="text/html", headers=headers)
+  return Response(_INDEX_BYTES, media_type="text/html", headers=headers)
+
+class _SPAStaticFiles(StaticFiles):
+  """StaticFiles that answers unknown paths (client-side routes) with the app shell."""
+  async def get_response(self, path: str, scope) -> Response:
+    if path in ("", ".", "index.html"):
+      return _index_response(Request(scope))
+    try:
+      return await super().get_response(path, scope)
+    except StarletteHTTPException as e:
+      if e.status_code != 404:
+        raise
+      return _index_response(Request(scope))
+
+# Serve the Vue build (assets + SPA fallback) straight from Starlette. Mounted last so the
+# API/websocket routes above match first.
+app.mount(BASE_URL or "/", _SPAStaticFiles(directory=DIST_DIR, html=True), name="spa")
 
 if __name__ == "__main__":
     # Optional local dev entrypoint:
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Progress streams are many small, already-batched frames: permessage-deflate costs
+    # more CPU per frame than it saves on the wire, so keep it off (same flags as the
+    # launch scripts: --ws websockets --ws-per-message-deflate false).
+    # loop/http "auto" pick uvloop/httptools when installed (both optional, see the
+    # uvloop guard above) and fall back to asyncio/h11 otherwise.
+    # Single worker on purpose: job_runner lives in this process and is what enforces
+    # at-most-one AutoGluon run, so extra workers would each start their own runs.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="auto",
+        ws="websockets",
+        ws_per_message_deflate=False,
+        log_level="warning",
+    )
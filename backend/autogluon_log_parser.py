@@ -1,34 +1,101 @@
 import re
-from typing import Dict, Any, List, Optional, Tuple
-
-def _search(pattern: str, text: str, flags=re.MULTILINE | re.DOTALL) -> Optional[re.Match]:
-    return re.search(pattern, text, flags)
-
-def _findall(pattern: str, text: str, flags=re.MULTILINE | re.DOTALL) -> List[Tuple[str, ...]]:
-    return re.findall(pattern, text, flags)
-from typing import List, Dict, Any, Optional
+import heapq
+import io
+import mmap
+import os
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+# All patterns are compiled once at import; the parser runs once per job log, and
+# re.search(str, ...) would pay a cache lookup per call. Same flags as before.
+# They are byte patterns so a log can be searched in place through an mmap; only the
+# captured groups are decoded (see _s). Byte patterns are ASCII-only by definition, so
+# \d, \s and \w never do Unicode lookups.
+# Optional sections are gated on a literal that every match must contain: a missing
+# section then costs one substring scan instead of a full regex scan.
+_FLAGS = re.MULTILINE | re.DOTALL
+
+_SYS_BLOCK_RE = re.compile(rb"=+ System Info =+\n(?P<body>.+?)\n=+", _FLAGS)
+_PRESET_ALIAS_RE = re.compile(rb"Preset alias specified:\s*'([^']+)'\s+maps to\s+'([^']+)'", _FLAGS)
+_PRESETS_RE = re.compile(rb"Presets specified:\s*(\[[^\]]*\])", _FLAGS)
+_HYPERPARAMS_PRESET_RE = re.compile(rb"Using hyperparameters preset:\s*hyperparameters='([^']+)'", _FLAGS)
+_SAVE_PATH_RE = re.compile(rb'AutoGluon will save models to\s+"([^"]+)"', _FLAGS)
+_TRAIN_ROWS_RE = re.compile(rb"Train Data Rows:\s*(\d+)", _FLAGS)
+_TRAIN_COLS_RE = re.compile(rb"Train Data Columns:\s*(\d+)", _FLAGS)
+_LABEL_RE = re.compile(rb"Label Column:\s*([^\n]+)", _FLAGS)
+_PROBLEM_TYPE_RE = re.compile(rb"Problem Type:\s*([^\n]+)", _FLAGS)
+_EVAL_METRIC_RE = re.compile(rb"AutoGluon will gauge predictive performance using evaluation metric:\s*'([^']+)'", _FLAGS)
+_SPLIT_RE = re.compile(rb"Automatically generating train/validation split with holdout_frac=([0-9.]+),\s*Train Rows:\s*(\d+),\s*Val Rows:\s*(\d+)", _FLAGS)
+_FEATURES_RE = re.compile(rb"(\d+)\s+features in original data used to generate\s+(\d+)\s+features in processed data", _FLAGS)
+_PROCESSED_MEM_RE = re.compile(rb"Train Data \(Processed\) Memory Usage:\s*([0-9.]+)\s*MB", _FLAGS)
+# start of each model section; sections are sliced between consecutive starts
+_MODEL_START_RE = re.compile(rb"^Fitting model:\s*([^\s.]+)\s*\.\.\.", re.MULTILINE)
+# the remaining per-model fields in one pattern: a section is walked once with finditer and
+# each match dispatched on m.lastgroup (the first occurrence of a field wins, as with search).
+# Score and runtimes are plain "<number>[s]\t = <sentinel>" lines, see _float_before.
+_BLOCK_FIELDS_RE = re.compile(
+    rb"(?P<res>Fitting with cpus=(?P<cpus>\d+),\s*gpus=(?P<gpus>\d+)(?:,\s*mem=(?P<mu>[0-9.]+)/(?P<ma>[0-9.]+)\s*GB)?)"
+    rb"|(?P<ew>Ensemble Weights:\s*(?P<eww>{[^}]+}))",
+    _FLAGS,
+)
+# These read a single log line, so their gaps stop at a newline ([^\n]*?, [^|\n], [^\n]*)
+# instead of running under DOTALL: a truncated line fails after one line of retries rather
+# than re-scanning the rest of the log from every candidate start.
+_TRAINING_COMPLETE_RE = re.compile(rb"training complete, total runtime[ \t]*=[ \t]*([0-9.]+)s[^\n]*?Best model:[ \t]*([^|\n]+?)[ \t]*\|[ \t]*Estimated inference throughput:[ \t]*([0-9.]+)[ \t]*rows/s[ \t]*\((\d+)[ \t]*batch size\)", _FLAGS)
+_PREDICTOR_SAVED_RE = re.compile(rb'TabularPredictor saved[^\n]*?load\("([^"\n]+)"\)', _FLAGS)
+_THRESHOLD_NOTE_RE = re.compile(rb"Disabling decision threshold calibration[^\n]*", _FLAGS)
+
+def _s(b: bytes) -> str:
+    # a log that's still being written can end mid-character
+    return b.decode("utf-8", "replace")
+
+_SCORE_SENTINEL = b"= Validation score"
+
+def _float_before(block: bytes, sentinel: bytes, unit: bytes = b"") -> Tuple[Optional[float], int]:
+    """
+    Number right before the first `sentinel` in block ("\t1.45s\t = Training   runtime"),
+    skipping blanks and an optional unit suffix. Returns (value or None, sentinel index).
+    """
+    i = block.find(sentinel)
+    if i < 0:
+        return None, i
+    j = i
+    while j > 0 and block[j - 1] in b" \t":
+        j -= 1
+    if unit:
+        if block[j - len(unit):j] != unit:
+            return None, i
+        j -= len(unit)
+    k = j
+    while k > 0 and block[k - 1] in b"0123456789.":
+        k -= 1
+    try:
+        return float(block[k:j]), i
+    except ValueError:
+        return None, i
+
+def _fmt(x, default="?"):
+    return default if x is None else str(x)
 
 def format_models(models: List[Dict[str, Any]], top: Optional[int] = None) -> str:
     """
     Format a list of AutoGluon model dicts into a readable multiline string.
 
-    - Sorts by score (desc) when available.
+    - Keeps the log's order (the order models were fit in).
     - Shows metric, train/val runtimes, basic resources, and ensemble weights if present.
-    - `top` limits how many entries are included (after sorting).
+    - `top` keeps only the `top` best-scoring entries (score desc; unscored last).
 
     Returns a single string.
     """
     if not models:
         return ""
 
-    # Sort by score desc when present; keep original order for ties/missing
-    def _score_key(m: Dict[str, Any]):
-        s = m.get("score")
-        return (s is not None, s if isinstance(s, (int, float)) else float("-inf"))
     sorted_models = models
-
     if top is not None and top > 0:
-        sorted_models = sorted_models[:top]
+        # partial selection, O(n log top) instead of sorting everything
+        sorted_models = heapq.nlargest(
+            top, models,
+            key=lambda m: m["score"] if isinstance(m.get("score"), (int, float)) else float("-inf"),
+        )
 
     lines = []
     lines.append("Validation models:")
@@ -67,30 +134,27 @@ def format_models(models: List[Dict[str, Any]], top: Optional[int] = None) -> st
             extra_parts.append(f"weights={ew}")
         extra_str = ", ".join(extra_parts)
 
-        # Assemble line without nested f-strings
-        line = f"• {name}: {score_str}{metric_str}"
+        # Assemble line from fragments, joined once
+        parts = [f"• {name}: {score_str}{metric_str}"]
         if rt_str:
-            line += f" — {rt_str}"
+            parts.append(f" — {rt_str}")
         if res_str:
-            line += f" — {res_str}"
+            parts.append(f" — {res_str}")
         if extra_str:
-            line += f" — {extra_str}"
+            parts.append(f" — {extra_str}")
 
-        lines.append(line)
+        lines.append("".join(parts))
 
-    return "".join(lines)
+    return "\n".join(lines)
 
-def one_is_none(variables: list[Any]):
-    for variable in variables:
-        if variable is None:
-            return True
-    return False
-
-def parse_autogluon_log(log_text: str) -> Dict[str, Any]:
+def parse_autogluon_log(log_text: Union[str, bytes, bytearray, mmap.mmap]) -> Dict[str, Any]:
     """
     Parse an AutoGluon Tabular log (even if incomplete) and produce a structured dict
     with a human-readable summary under ['summary'].
 
+    Accepts the text or its raw UTF-8 bytes; pass an mmap (see parse_autogluon_log_file)
+    to search a large log without reading it into memory.
+
     Returns:
         {
           'system': {...},
@@ -108,7 +172,9 @@ def parse_autogluon_log(log_text: str) -> Dict[str, Any]:
           'summary': "..."
         }
     """
-    t = log_text or ""
+    t = log_text or b""
+    if isinstance(t, str):
+        t = t.encode("utf-8")
     data: Dict[str, Any] = {
         'system': {},
         'presets': {},
@@ -125,49 +191,47 @@ def parse_autogluon_log(log_text: str) -> Dict[str, Any]:
     }
 
     # --- System Info block ---
-    sys_block = _search(r"=+ System Info =+\n(?P<body>.+?)\n=+",
-                        t)
+    sys_block = _SYS_BLOCK_RE.search(t) if t.find(b" System Info ") != -1 else None
     if sys_block:
-        body = sys_block.group("body")
+        body = _s(sys_block.group("body"))
+        # "Key:   value" lines; a plain partition instead of a regex per line
         for line in body.strip().splitlines():
-            m = _search(r"^\s*([^:]+):\s+(.*)$", line)
-            if m:
-                key = m.group(1).strip()
-                val = m.group(2).strip()
-                data['system'][key] = val
+            key, sep, val = line.partition(":")
+            if sep and val[:1].isspace():
+                data['system'][key.strip()] = val.strip()
 
     # --- Presets & hyperparameters preset ---
-    m = _search(r"Preset alias specified:\s*'([^']+)'\s+maps to\s+'([^']+)'", t)
+    m = _PRESET_ALIAS_RE.search(t) if t.find(b"Preset alias specified:") != -1 else None
     if m:
-        data['presets']['alias'] = m.group(1)
-        data['presets']['alias_maps_to'] = m.group(2)
-    m = _search(r"Presets specified:\s*(\[[^\]]*\])", t)
+        data['presets']['alias'] = _s(m.group(1))
+        data['presets']['alias_maps_to'] = _s(m.group(2))
+    m = _PRESETS_RE.search(t) if t.find(b"Presets specified:") != -1 else None
     if m:
-        data['presets']['specified'] = m.group(1)
-    m = _search(r"Using hyperparameters preset:\s*hyperparameters='([^']+)'", t)
+        data['presets']['specified'] = _s(m.group(1))
+    m = _HYPERPARAMS_PRESET_RE.search(t) if t.find(b"Using hyperparameters preset:") != -1 else None
     if m:
-        data['presets']['hyperparameters'] = m.group(1)
+        data['presets']['hyperparameters'] = _s(m.group(1))
 
     # --- Save path ---
-    m = _search(r'AutoGluon will save models to\s+"([^"]+)"', t)
+    m = _SAVE_PATH_RE.search(t)
     if m:
-        data['paths']['model_dir'] = m.group(1)
+        data['paths']['model_dir'] = _s(m.group(1))
 
     # --- Dataset stats ---
-    m = _search(r"Train Data Rows:\s*(\d+)", t);  data['dataset']['rows'] = int(m.group(1)) if m else None
-    m = _search(r"Train Data Columns:\s*(\d+)", t);  data['dataset']['cols'] = int(m.group(1)) if m else None
-    m = _search(r"Label Column:\s*([^\n]+)", t);  data['dataset']['label'] = m.group(1).strip() if m else None
+    m = _TRAIN_ROWS_RE.search(t);  data['dataset']['rows'] = int(m.group(1)) if m else None
+    m = _TRAIN_COLS_RE.search(t);  data['dataset']['cols'] = int(m.group(1)) if m else None
+    m = _LABEL_RE.search(t);  data['dataset']['label'] = _s(m.group(1)).strip() if m else None
 
     # --- Problem type & labels ---
-    m = _search(r"Problem Type:\s*([^\n]+)", t)
+    m = _PROBLEM_TYPE_RE.search(t)
     if m:
-        data['problem']['type'] = m.group(1).strip()
-    m = _search(r"AutoGluon will gauge predictive performance using evaluation metric:\s*'([^']+)'", t)
+        data['problem']['type'] = _s(m.group(1)).strip()
+    m = _EVAL_METRIC_RE.search(t)
     if m:
-        data['eval']['metric'] = m.group(1)
+        data['eval']['metric'] = _s(m.group(1))
 
     # --- Split info ---
-    m = _search(r"Automatically generating train/validation split with holdout_frac=([0-9.]+),\s*Train Rows:\s*(\d+),\s*Val Rows:\s*(\d+)", t)
+    m = _SPLIT_RE.search(t) if t.find(b"Automatically generating train/validation split") != -1 else None
     if m:
         data['split'] = {
             'holdout_frac': float(m.group(1)),
@@ -176,53 +240,53 @@ def parse_autogluon_log(log_text: str) -> Dict[str, Any]:
         }
 
     # --- Feature generation summary (counts) ---
-    m = _search(r"(\d+)\s+features in original data used to generate\s+(\d+)\s+features in processed data", t)
+    m = _FEATURES_RE.search(t)
     if m:
         data['featuregen']['original_features'] = int(m.group(1))
         data['featuregen']['processed_features'] = int(m.group(2))
-    m = _search(r"Train Data \(Processed\) Memory Usage:\s*([0-9.]+)\s*MB", t)
+    m = _PROCESSED_MEM_RE.search(t)
     if m:
         data['featuregen']['processed_mem_mb'] = float(m.group(1))
 
     # --- Model fit sections ---
-    # Pattern captures model blocks even if truncated.
-    # Start with "Fitting model: NAME ..." and greedily take until next "Fitting model:" or end.
-    model_blocks = _findall(r"(Fitting model:\s*([^\s.]+)\s*\.\.\.[\s\S]*?)(?=^Fitting model:|\Z)", t)
-    for full_block, model_name in model_blocks:
-        # Basic fields
+    # Captures model blocks even if truncated: each runs from its "Fitting model: NAME ..."
+    # line to the next one (or end of log). One linear pass for the anchors, then slicing.
+    starts = [(m.start(), _s(m.group(1))) for m in _MODEL_START_RE.finditer(t)]
+    ends = [pos for pos, _ in starts[1:]] + [len(t)]
+    # best 5 by score, kept while parsing: min-heap of (score, -index, model), so on equal
+    # scores the earlier model ranks higher (same order as a stable sort by score)
+    top5: List[Tuple[float, int, Dict[str, Any]]] = []
+    for (start, model_name), end in zip(starts, ends):
+        full_block = t[start:end]  # bytes copy of one section (also for an mmap)
         resources = {}
-        m = _search(r"Fitting with cpus=(\d+),\s*gpus=(\d+)(?:,\s*mem=([0-9.]+)/([0-9.]+)\s*GB)?", full_block)
-        if m:
-            resources = {
-                'cpus': int(m.group(1)),
-                'gpus': int(m.group(2)),
-            }
-            if m.group(3) and m.group(4):
-                resources.update({'mem_used_gb': float(m.group(3)), 'mem_avail_gb': float(m.group(4))})
-
-        # Score & metric (may be missing if incomplete)
-        score = None; metric = None
-        m = _search(r"([0-9.]+)\s*=\s*Validation score\s*\(([^)]+)\)", full_block)
-        if m:
-            score = float(m.group(1)); metric = m.group(2).strip()
-
-        # Runtimes
+        score = None; metric = None   # may be missing if incomplete
         train_rt = None; val_rt = None
-        m = _search(r"([0-9.]+)s\s*=\s*Training\s+runtime", full_block)
-        if m:
-            train_rt = float(m.group(1))
-        m = _search(r"([0-9.]+)s\s*=\s*Validation\s+runtime", full_block)
-        if m:
-            val_rt = float(m.group(1))
-
-        # Extra notes (ensembles, weights, etc.)
-        extra = {}
-        m = _search(r"Ensemble Weights:\s*({[^}]+})", full_block)
-        if m:
-            extra['ensemble_weights'] = m.group(1)
-
-        if((not one_is_none([train_rt, score, metric])) and resources != {}):
-            data['models'].append({
+        extra = {}                    # ensembles, weights, etc.
+        train_rt, _ = _float_before(full_block, b"= Training", b"s")
+        val_rt, _ = _float_before(full_block, b"= Validation runtime", b"s")
+        score, i = _float_before(full_block, _SCORE_SENTINEL)
+        if score is not None:
+            # "= Validation score   (accuracy)"; a score only counts with its metric
+            lo = full_block.find(b"(", i)
+            hi = full_block.find(b")", lo + 1) if lo != -1 else -1
+            if hi > lo + 1 and not full_block[i + len(_SCORE_SENTINEL):lo].strip():
+                metric = _s(full_block[lo + 1:hi]).strip()
+            else:
+                score = None
+        for m in _BLOCK_FIELDS_RE.finditer(full_block):
+            kind = m.lastgroup
+            if kind == 'res' and not resources:
+                resources = {
+                    'cpus': int(m.group('cpus')),
+                    'gpus': int(m.group('gpus')),
+                }
+                if m.group('mu') and m.group('ma'):
+                    resources.update({'mem_used_gb': float(m.group('mu')), 'mem_avail_gb': float(m.group('ma'))})
+            elif kind == 'ew' and 'ensemble_weights' not in extra:
+                extra['ensemble_weights'] = _s(m.group('eww'))
+
+        if train_rt is not None and score is not None and metric is not None and resources:
+            model = {
                 'name': model_name,
                 'score': score,
                 'metric': metric,
@@ -230,38 +294,40 @@ def parse_autogluon_log(log_text: str) -> Dict[str, Any]:
                 'val_runtime_s': val_rt,
                 'resources': resources or None,
                 'extra': extra or None,
-            })
+            }
+            entry = (score, -len(data['models']), model)
+            data['models'].append(model)
+            if len(top5) < 5:
+                heapq.heappush(top5, entry)
+            else:
+                heapq.heappushpop(top5, entry)
+    top5.sort(reverse=True)
 
     # --- Best model, throughput, total runtime ---
-    m = _search(r"training complete, total runtime\s*=\s*([0-9.]+)s.*?Best model:\s*([^\|]+?)\s*\|\s*Estimated inference throughput:\s*([0-9.]+)\s*rows/s\s*\((\d+)\s*batch size\)",
-                t)
+    m = _TRAINING_COMPLETE_RE.search(t) if t.find(b"Estimated inference throughput:") != -1 else None
     if m:
         data['runtime']['total_runtime_s'] = float(m.group(1))
-        data['best_model'] = {'name': m.group(2).strip()}
+        data['best_model'] = {'name': _s(m.group(2)).strip()}
         data['runtime']['throughput_rows_per_s'] = float(m.group(3))
         data['runtime']['batch_size'] = int(m.group(4))
     else:
         # If not present, try to at least infer a best model by max score among parsed models
-        scored = [m for m in data['models'] if m.get('score') is not None]
-        if scored:
-            best = max(scored, key=lambda x: x['score'])
+        if top5:
+            best = top5[0][2]
             data['best_model'] = {'name': best['name'], 'inferred': True, 'score': best['score']}
             data['notes'].append("Best model inferred from available scores (training may be incomplete).")
 
     # --- Predictor save path (if present) ---
-    m = _search(r'TabularPredictor saved.*?load\("([^"]+)"\)', t)
+    m = _PREDICTOR_SAVED_RE.search(t) if t.find(b"TabularPredictor saved") != -1 else None
     if m:
-        data['paths']['predictor_load_path'] = m.group(1)
+        data['paths']['predictor_load_path'] = _s(m.group(1))
 
     # --- Decision threshold calibration note (keep as a note if present) ---
-    m = _search(r"Disabling decision threshold calibration.*", t)
+    m = _THRESHOLD_NOTE_RE.search(t) if t.find(b"Disabling decision threshold calibration") != -1 else None
     if m:
-        data['notes'].append(m.group(0).strip())
+        data['notes'].append(_s(m.group(0)).strip())
 
     # --- Build human-readable summary ---
-    def fmt(x, default="?"):
-        return default if x is None else str(x)
-
     metric = data['eval'].get('metric')
     rows = data['dataset'].get('rows')
     cols = data['dataset'].get('cols')
@@ -275,58 +341,64 @@ def parse_autogluon_log(log_text: str) -> Dict[str, Any]:
 
     # Top models by score (if any)
     top_lines = []
-    scored_models = [m for m in data['models'] if m.get('score') is not None]
-    scored_models.sort(key=lambda m: m['score'], reverse=True)
-    for m in scored_models[:5]:
+    for _, _, m in top5:
         metric_str = f" ({m['metric']})" if m.get('metric') else ""
         train_str  = f", train {m['train_runtime_s']}s" if m.get('train_runtime_s') is not None else ""
         val_str    = f", val {m['val_runtime_s']}s"     if m.get('val_runtime_s')   is not None else ""
         top_lines.append(f"• {m['name']}: {m['score']:.4f}{metric_str}{train_str}{val_str}")
 
-    summary_parts = []
-    summary_parts.append("AutoGluon Tabular run summary")
+    # written straight into one buffer; each line after the title starts with "\n"
+    buf = io.StringIO()
+    buf.write("AutoGluon Tabular run summary")
     if rows or cols or label or prob:
-        summary_parts.append(f"- Dataset: {fmt(rows)} rows, {fmt(cols)} cols | label='{fmt(label)}' | problem={fmt(prob)}")
+        buf.write(f"\n- Dataset: {_fmt(rows)} rows, {_fmt(cols)} cols | label='{_fmt(label)}' | problem={_fmt(prob)}")
     if tr or vr or metric:
-        summary_parts.append(f"- Split: train={fmt(tr)} | val={fmt(vr)} | metric={fmt(metric)}")
+        buf.write(f"\n- Split: train={_fmt(tr)} | val={_fmt(vr)} | metric={_fmt(metric)}")
     fg = data.get('featuregen', {})
     if fg.get('original_features') is not None:
         processed = fg.get('processed_features', '?')
         mem_mb = fg.get('processed_mem_mb')
         mem_str = f", processed mem ~{mem_mb} MB" if mem_mb is not None else ""
-        summary_parts.append(
-            f"- Features: {fg['original_features']} → {processed} processed{mem_str}"
+        buf.write(
+            f"\n- Features: {fg['original_features']} → {processed} processed{mem_str}"
             )
     if top_lines:
-        summary_parts.append("- Validation scores (top):\n  " + "\n  ".join(top_lines))
+        buf.write("\n- Validation scores (top):\n  " + "\n  ".join(top_lines))
     if best_name:
-        summary_parts.append(f"- Best model: {best_name}")
+        buf.write(f"\n- Best model: {best_name}")
     if total_rt is not None:
-        summary_parts.append(f"- Total training runtime: {total_rt}s")
+        buf.write(f"\n- Total training runtime: {total_rt}s")
     if save_dir:
-        summary_parts.append(f"- Models saved to: {save_dir}")
+        buf.write(f"\n- Models saved to: {save_dir}")
     rt = data.get('runtime', {})
     thr = rt.get('throughput_rows_per_s')
     if thr is not None:  # use None-check so 0.0 wouldn't be skipped
         batch = rt.get('batch_size')
         batch_str = f" @ batch {batch}" if batch is not None else ""
-        summary_parts.append(
-            f"- Inference throughput (est): {thr} rows/s{batch_str}"
+        buf.write(
+            f"\n- Inference throughput (est): {thr} rows/s{batch_str}"
         )
     if data['notes']:
-        summary_parts.append("- Notes:\n  " + "\n  ".join(f"• {n}" for n in data['notes']))
+        buf.write("\n- Notes:\n  " + "\n  ".join(f"• {n}" for n in data['notes']))
 
-    data['summary'] = "\n".join(summary_parts)
+    data['summary'] = buf.getvalue()
     data["models"] = format_models(data["models"])
     return data
 
 
+def parse_autogluon_log_file(path: str) -> Dict[str, Any]:
+    """parse_autogluon_log over a log file, mapped instead of read (pages load on demand)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return parse_autogluon_log(b"")  # mmap can't map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_autogluon_log(mm)
+
+
 # Example usage:
 if __name__ == "__main__":
     
-    with open("./autogluon_runs/e6169d252e9f44dab2b90d7bb5821ada/logs/predictor_log.txt", "r") as file:
-        SAMPLE = file.read()
-    result = parse_autogluon_log(SAMPLE)
+    result = parse_autogluon_log_file("./autogluon_runs/e6169d252e9f44dab2b90d7bb5821ada/logs/predictor_log.txt")
     #print(result['summary'])
     # Access structured pieces:
     print(result['models'])
@@ -1,8 +1,131 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Union, IO, Optional, Any
+import os
 from io import BytesIO
+import contextlib
+import csv
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+# how much of a CSV is read to guess its delimiter
+_SNIFF_BYTES = 64 * 1024
+
+def _sniff_delimiter(handle: Union[str, IO[bytes]]) -> str:
+    """Guess the delimiter from the head of a path or seekable handle (position is kept)."""
+    if isinstance(handle, str):
+        with open(handle, "rb") as f:
+            sample = f.read(_SNIFF_BYTES)
+    else:
+        pos = handle.tell()
+        sample = handle.read(_SNIFF_BYTES)
+        handle.seek(pos)
+    if isinstance(sample, bytes):
+        sample = sample.decode("utf-8", errors="replace")
+    if len(sample) >= _SNIFF_BYTES and "\n" in sample:
+        # don't let a cut-off last line skew the guess
+        sample = sample[:sample.rindex("\n")]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",\t;|").delimiter
+    except csv.Error:
+        return ","
+
+def _rewind(handle: Union[str, IO[bytes]], start: Optional[int]) -> None:
+    if start is not None:
+        handle.seek(start)
+
+def read_csv_arrow(source: Union[str, IO[bytes]], sep: str = ",") -> pd.DataFrame:
+    """
+    pyarrow's multi-threaded CSV reader, returning the column types pd.read_csv gives for
+    the same file (requires pyarrow). pyarrow infers dates, times, timestamps and decimals
+    that pandas leaves as text; those columns are read again as strings so a predictor
+    sees the same feature types it was trained on.
+    """
+    start = None if isinstance(source, str) else source.tell()
+
+    def read(column_types=None):
+        return pacsv.read_csv(
+            source,
+            read_options=pacsv.ReadOptions(use_threads=True),
+            parse_options=pacsv.ParseOptions(delimiter=sep),
+            # empty cells are missing values in pandas, not empty strings
+            convert_options=pacsv.ConvertOptions(column_types=column_types or {}, strings_can_be_null=True),
+        )
+
+    table = read()
+    as_text = {
+        f.name: pa.string()
+        for f in table.schema
+        if pa.types.is_temporal(f.type) or pa.types.is_decimal(f.type)
+    }
+    if as_text:
+        _rewind(source, start)
+        table = read(as_text)
+    df = table.to_pandas()
+    for f in table.schema:
+        if pa.types.is_null(f.type):
+            # an all-empty column is float NaN in pandas, not object None
+            df[f.name] = df[f.name].astype("float64")
+    return df
+
+def _read_csv(handle: Union[str, IO[bytes]], ext: Optional[str], sheet, **kwargs: Any) -> pd.DataFrame:
+    # If it's explicitly a TSV, default to tab; otherwise sniff the delimiter once from
+    # the head of the file so the fast engines can be used (sep=None would force
+    # pandas' pure-python engine for the whole file)
+    sniffed = ext != ".tsv"
+    sep = _sniff_delimiter(handle) if sniffed else "\t"
+    start = None if isinstance(handle, str) else handle.tell()
+    if _HAS_PYARROW and not kwargs:
+        # pyarrow directly rather than pd.read_csv(engine="pyarrow"), which returns dates as
+        # datetime.date objects; read_csv_arrow keeps pd.read_csv's types. pandas options
+        # (nrows, dtype, ...) go to the C engine
+        try:
+            return read_csv_arrow(handle, sep)
+        except pa.ArrowInvalid:
+            # e.g. ragged rows; let the C/python engines decide
+            _rewind(handle, start)
+    try:
+        return pd.read_csv(handle, sep=sep, engine="c", **kwargs)
+    except pd.errors.ParserError:
+        if not sniffed:
+            raise
+    # the sniffed delimiter didn't hold past the sampled head; let pandas' python engine
+    # sniff the whole file (slow, only for files the fast path can't parse)
+    _rewind(handle, start)
+    return pd.read_csv(handle, sep=None, engine="python", **kwargs)
+
+def _read_xlsx(handle: Union[str, IO[bytes]], ext: Optional[str], sheet, **kwargs: Any) -> pd.DataFrame:
+    return pd.read_excel(handle, sheet_name=sheet, engine="openpyxl", **kwargs)
+
+def _read_xls(handle: Union[str, IO[bytes]], ext: Optional[str], sheet, **kwargs: Any) -> pd.DataFrame:
+    try:
+        return pd.read_excel(handle, sheet_name=sheet, engine="xlrd", **kwargs)
+    except ImportError as e:
+        raise RuntimeError(
+            "Reading .xls requires 'xlrd<2.0'. Install with: pip install 'xlrd<2.0'"
+        ) from e
+
+# extension -> reader; None is raw bytes / a handle without a name, treated as CSV
+_READERS = {
+    ".csv": _read_csv,
+    ".tsv": _read_csv,
+    ".txt": _read_csv,
+    None: _read_csv,
+    # Excel (modern)
+    ".xlsx": _read_xlsx,
+    ".xlsm": _read_xlsx,
+    ".xltx": _read_xlsx,
+    ".xltm": _read_xlsx,
+    # Legacy .xls
+    ".xls": _read_xls,
+}
+
 def load_table(
     src: Union[str, Path, bytes, IO[bytes]],
     *,
@@ -43,25 +166,72 @@ def load_table(
         name = getattr(src, "name", "") or ""
         ext = Path(name).suffix.lower() if name else None
 
-    # CSV
-    if ext in {".csv", ".tsv", ".txt"} or ext is None:
-        # If it's explicitly a TSV, default to tab; otherwise let pandas sniff.
-        if ext == ".tsv":
-            return pd.read_csv(handle, sep="\t", **kwargs)
-        # sep=None triggers delimiter inference (uses python engine)
-        return pd.read_csv(handle, sep=None, engine="python", **kwargs)
+    reader = _READERS.get(ext)
+    if reader is None:
+        raise ValueError(f"Unsupported file type: {ext!r}")
+    return reader(handle, ext, sheet, **kwargs)
 
-    # Excel (modern)
-    if ext in {".xlsx", ".xlsm", ".xltx", ".xltm"}:
-        return pd.read_excel(handle, sheet_name=sheet, engine="openpyxl", **kwargs)
+def read_frame(path: str) -> pd.DataFrame:
+    """Read an inference input: Parquet for .parquet, otherwise CSV (same column types as pd.read_csv)."""
+    if path.lower().endswith(".parquet"):
+        if _HAS_PYARROW:
+            import pyarrow.parquet as pq
+            return pq.read_table(path, use_threads=True).to_pandas()
+        return pd.read_parquet(path)
+    # CSV, also the default if extension unknown
+    if _HAS_PYARROW:
+        return read_csv_arrow(path)
+    return pd.read_csv(path)
 
-    # Legacy .xls
-    if ext == ".xls":
-        try:
-            return pd.read_excel(handle, sheet_name=sheet, engine="xlrd", **kwargs)
-        except ImportError as e:
-            raise RuntimeError(
-                "Reading .xls requires 'xlrd<2.0'. Install with: pip install 'xlrd<2.0'"
-            ) from e
+def write_frame(df: pd.DataFrame, path: str, index: bool = False) -> None:
+    """Write df as CSV (or Parquet for .parquet); index=True writes the index as the first column."""
+    parent = os.path.dirname(path)
+    if parent and not os.path.exists(parent):
+        os.makedirs(parent, exist_ok=True)
+    if path.lower().endswith(".parquet"):
+        df.to_parquet(path, index=index)
+        return
+    # CSV stays on to_csv: pyarrow's writer quotes every string cell and the header and
+    # writes bools as true/false, which changes the downloaded prediction files
+    df.to_csv(path, index=index)
+
+# predict_proba fan-out. Each call is already multi-threaded (LightGBM/XGBoost/CatBoost
+# use OpenMP, NNs use torch), so the pool splits this process's CPUs between workers
+# rather than adding a full set of model threads per worker. Both knobs can be set from
+# the environment.
+# most concurrent predict_proba calls
+PROBA_MAX_WORKERS = int(os.getenv("OOD_AUTOML_PROBA_MAX_WORKERS", "4"))
+# rows per worker below which a single predict_proba call is used
+PROBA_PARALLEL_MIN_ROWS = int(os.getenv("OOD_AUTOML_PROBA_MIN_ROWS", "10000"))
+
+def _usable_cpus() -> int:
+    # the CPUs this process may run on (Slurm/cgroup allocation), not the node's core count
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS/Windows
+        return os.cpu_count() or 1
+
+def _thread_limit(n: int):
+    # cap native (OpenMP/BLAS) threads; threadpoolctl comes with scikit-learn, which
+    # AutoGluon depends on
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return contextlib.nullcontext()
+    return threadpool_limits(limits=n)
+
+def predict_proba_chunked(predictor, df: pd.DataFrame):
+    """predict_proba over row chunks on a thread pool; the tree/NN backends release the GIL."""
+    cpus = _usable_cpus()
+    n_workers = min(PROBA_MAX_WORKERS, cpus, len(df) // PROBA_PARALLEL_MIN_ROWS)
+    if n_workers <= 1:
+        return predictor.predict_proba(df)
+    threads_per_worker = max(1, cpus // n_workers)
 
-    raise ValueError(f"Unsupported file type: {ext!r}")
\ No newline at end of file
+    bounds = [len(df) * i // n_workers for i in range(n_workers + 1)]
+    chunks = [df.iloc[lo:hi] for lo, hi in zip(bounds, bounds[1:])]
+    # the limits are process-wide, so they are set once here and restored after the pool
+    # is done; per-worker limits would save and restore over each other
+    with _thread_limit(threads_per_worker), ThreadPoolExecutor(max_workers=n_workers) as ex:
+        parts = list(ex.map(predictor.predict_proba, chunks))
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional
+from contextlib import contextmanager
+import os
+import pickle
+import sqlite3
+import orjson
+
+# Index of runs: job_id -> {"file_path", "cfg"}. Lives in SQLite so a single job can be
+# looked up by primary key without loading every entry; runs_index.pkl (the old format)
+# is migrated into it the first time the database is created.
+# The directory is $OOD_AUTOML_HOME, else ~/.ood_automl; nothing is touched until
+# init_db() is called (at app startup).
+HISTORIC_JOBS_ENV = "OOD_AUTOML_HOME"
+HISTORIC_JOBS_FILENAME = "runs_index.pkl"
+HISTORIC_JOBS_DB_FILENAME = "jobs.sqlite"
+
+# set by init_db
+_db_path: Optional[str] = None
+
+
+def jobs_directory() -> str:
+    return os.path.expanduser(os.environ.get(HISTORIC_JOBS_ENV) or "~/.ood_automl")
+
+
+@contextmanager
+def _connect(db_path: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+    # short-lived connections: callers run on worker threads (anyio.to_thread / the fit thread)
+    db_path = db_path or _db_path
+    if db_path is None:
+        raise RuntimeError("job index not initialised; call job_index.init_db() first")
+    conn = sqlite3.connect(db_path, timeout=10)
+    try:
+        with conn:  # commit / rollback
+            yield conn
+    finally:
+        conn.close()
+
+
+def _dump_cfg(cfg: Dict[str, Any]) -> str:
+    # cfg comes from the client as JSON; anything else (e.g. an in-memory train_df) is
+    # stored as its repr
+    return orjson.dumps(cfg, default=repr).decode("utf-8")
+
+
+def init_db(directory: Optional[str] = None) -> None:
+    """
+    Open (creating if needed) the index in directory, default jobs_directory(). On first
+    creation, entries from a runs_index.pkl in the same directory are imported.
+    """
+    global _db_path
+    directory = directory or jobs_directory()
+    os.makedirs(directory, exist_ok=True)
+    db_path = os.path.join(directory, HISTORIC_JOBS_DB_FILENAME)
+    legacy_path = os.path.join(directory, HISTORIC_JOBS_FILENAME)
+    fresh = not os.path.exists(db_path)
+    with _connect(db_path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, file_path TEXT, cfg TEXT)"
+        )
+        if fresh and os.path.exists(legacy_path):
+            with open(legacy_path, "rb") as f:
+                legacy = pickle.load(f)
+            conn.executemany(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)",
+                [(job_id, info.get("file_path"), _dump_cfg(info.get("cfg") or {}))
+                 for job_id, info in legacy.items()],
+            )
+    _db_path = db_path
+
+
+def add_job(job_id: str, file_path: str, cfg: Dict[str, Any]) -> None:
+    with _connect() as conn:
+        conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)", (job_id, file_path, _dump_cfg(cfg)))
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with _connect() as conn:
+        row = conn.execute("SELECT file_path, cfg FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    return {"file_path": row[0], "cfg": orjson.loads(row[1])}
+
+
+def list_job_ids() -> List[str]:
+    with _connect() as conn:
+        return [r[0] for r in conn.execute("SELECT job_id FROM jobs ORDER BY rowid")]
+
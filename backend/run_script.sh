@@ -2,5 +2,9 @@ python3 -m uvicorn main:app \
   --host 0.0.0.0 \
   --port "${port}" \
   --root-path "${root_path}" \
+  --loop auto \
+  --http auto \
+  --ws websockets \
+  --ws-per-message-deflate false \
   > server.log 2>&1 &
 wait
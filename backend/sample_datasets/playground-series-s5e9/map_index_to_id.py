@@ -1,9 +1,15 @@
 import pandas as pd
+try:
+    import pyarrow  # noqa: F401
+    ENGINE = "pyarrow"
+except ImportError:
+    ENGINE = "c"
 
-raw_results_dataframe = pd.read_csv("results.csv")
-test_dataframe = pd.read_csv("test.csv")
+# only the two columns that end up in the submission are parsed
+preds = pd.read_csv("results.csv", usecols=["prediction"], engine=ENGINE)
+test_ids = pd.read_csv("test.csv", usecols=["id"], engine=ENGINE)
 
-raw_results_dataframe["BeatsPerMinute"] = raw_results_dataframe.pop("prediction")
-raw_results_dataframe["id"] = test_dataframe["id"].values
-raw_results_dataframe = raw_results_dataframe[["id", "BeatsPerMinute"]]
-raw_results_dataframe.to_csv("real_results.csv", index=False)
+pd.DataFrame({
+    "id": test_ids["id"].to_numpy(copy=False),
+    "BeatsPerMinute": preds["prediction"].to_numpy(copy=False),
+}).to_csv("real_results.csv", index=False)
@@ -0,0 +1,91 @@
+# tests/test_helper.py
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+PARENT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PARENT))
+import helper
+from helper import load_table, predict_proba_chunked, read_csv_arrow, read_frame, write_frame
+
+
+def test_write_frame_csv_matches_to_csv(tmp_path):
+    df = pd.DataFrame(
+        {
+            "prediction": ["yes", "no, maybe", 'say "hi"'],
+            "flag": [True, False, True],
+            "score": [0.25, 1.0, -3.5],
+        }
+    )
+    df.index = pd.RangeIndex(len(df), name="row")
+
+    out = tmp_path / "sub" / "preds.csv"
+    write_frame(df, str(out), index=True)
+
+    # byte-for-byte what the endpoint wrote before: to_csv with the row number first
+    assert out.read_text() == df.to_csv(index=True)
+    back = pd.read_csv(out, index_col="row")
+    pd.testing.assert_frame_equal(back, df)
+
+
+# a date, a time, a timestamp and a decimal-looking column, plus blanks; pyarrow infers
+# types for the first three that pd.read_csv leaves as text
+DATE_LIKE_CSV = (
+    "id,signup,at,stamp,amount,city,empty,flag\n"
+    "1,2024-01-05,12:30:00,2024-01-05 12:30:00,1.50,Austin,,true\n"
+    "2,2024-02-06,13:00:00,2024-02-06 08:00:00,2.25,,,False\n"
+)
+
+
+def test_load_table_keeps_read_csv_dtypes(tmp_path):
+    path = tmp_path / "train.csv"
+    path.write_text(DATE_LIKE_CSV)
+
+    df = load_table(str(path))
+    expected = pd.read_csv(path)
+    pd.testing.assert_frame_equal(df, expected)
+    assert df["signup"].tolist() == ["2024-01-05", "2024-02-06"]
+
+
+def test_read_csv_arrow_matches_read_csv(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "train.csv"
+    path.write_text(DATE_LIKE_CSV)
+
+    pd.testing.assert_frame_equal(read_csv_arrow(str(path)), pd.read_csv(path))
+    with open(path, "rb") as f:
+        pd.testing.assert_frame_equal(read_csv_arrow(f), pd.read_csv(path))
+
+
+def test_read_frame_keeps_read_csv_dtypes(tmp_path):
+    # inference inputs must reach the predictor with the types training saw
+    path = tmp_path / "test.csv"
+    path.write_text(DATE_LIKE_CSV)
+    pd.testing.assert_frame_equal(read_frame(str(path)), pd.read_csv(path))
+
+
+def test_predict_proba_chunked_restores_thread_limits(monkeypatch):
+    threadpoolctl = pytest.importorskip("threadpoolctl")
+    monkeypatch.setattr(helper, "_usable_cpus", lambda: 4)
+    monkeypatch.setattr(helper, "PROBA_MAX_WORKERS", 4)
+    monkeypatch.setattr(helper, "PROBA_PARALLEL_MIN_ROWS", 2)
+
+    seen = []
+
+    class Predictor:
+        def predict_proba(self, chunk):
+            seen.append({p["num_threads"] for p in threadpoolctl.threadpool_info()})
+            return pd.DataFrame({"yes": chunk["x"] / 10})
+
+    df = pd.DataFrame({"x": range(8)})
+    with threadpoolctl.threadpool_limits(limits=3):
+        before = threadpoolctl.threadpool_info()
+        out = predict_proba_chunked(Predictor(), df)
+        assert threadpoolctl.threadpool_info() == before
+
+    pd.testing.assert_frame_equal(out, pd.DataFrame({"yes": df["x"] / 10}))
+    # four workers on four CPUs: one native thread each while the pool runs
+    assert len(seen) == 4
+    assert all(s <= {1} for s in seen)
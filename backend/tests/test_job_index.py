@@ -0,0 +1,66 @@
+# tests/test_job_index.py
+import pickle
+import sys
+from pathlib import Path
+
+import pytest
+
+PARENT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PARENT))
+import job_index
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(monkeypatch):
+    # every test opens its own index; never the real ~/.ood_automl
+    monkeypatch.setattr(job_index, "_db_path", None)
+
+
+def test_add_get_list_roundtrip(tmp_path):
+    job_index.init_db(str(tmp_path))
+
+    job_index.add_job("a", "/runs/a", {"label": "y", "presets": "best_quality"})
+    job_index.add_job("b", "/runs/b", {"label": "z", "train_df": object()})
+
+    assert job_index.list_job_ids() == ["a", "b"]
+    assert job_index.get_job("a") == {"file_path": "/runs/a", "cfg": {"label": "y", "presets": "best_quality"}}
+    # non-JSON values are kept as their repr
+    assert isinstance(job_index.get_job("b")["cfg"]["train_df"], str)
+    assert job_index.get_job("missing") is None
+
+    # re-adding a job replaces it
+    job_index.add_job("a", "/runs/a2", {})
+    assert job_index.get_job("a") == {"file_path": "/runs/a2", "cfg": {}}
+    assert job_index.list_job_ids() == ["b", "a"]
+
+
+def test_legacy_pickle_is_migrated_once(tmp_path):
+    legacy = {
+        "old1": {"file_path": "/runs/old1", "cfg": {"label": "y"}},
+        "old2": {"file_path": "/runs/old2"},
+    }
+    with open(tmp_path / "runs_index.pkl", "wb") as f:
+        pickle.dump(legacy, f)
+
+    job_index.init_db(str(tmp_path))
+    assert job_index.list_job_ids() == ["old1", "old2"]
+    assert job_index.get_job("old1") == {"file_path": "/runs/old1", "cfg": {"label": "y"}}
+    assert job_index.get_job("old2") == {"file_path": "/runs/old2", "cfg": {}}
+
+    # an existing database is not re-seeded from the pickle
+    job_index.add_job("new", "/runs/new", {})
+    with open(tmp_path / "runs_index.pkl", "wb") as f:
+        pickle.dump({"late": {"file_path": "/runs/late"}}, f)
+    job_index.init_db(str(tmp_path))
+    assert job_index.list_job_ids() == ["old1", "old2", "new"]
+
+
+def test_directory_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("OOD_AUTOML_HOME", str(tmp_path / "home"))
+    job_index.init_db()
+    assert (tmp_path / "home" / "jobs.sqlite").exists()
+
+
+def test_use_before_init_raises():
+    with pytest.raises(RuntimeError):
+        job_index.list_job_ids()
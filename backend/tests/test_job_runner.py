@@ -10,6 +10,7 @@ import pytest
 # ---- import your JobRunner from the module that defines it ----
 # from yourmodule.sessions import JobRunner
 from sessions import JobRunner  # adjust import to your project layout
+import job_index
 
 
 # ---------- Helpers: fake AutoGluon (no heavy deps required) ----------
@@ -57,6 +58,14 @@ def stub_autogluon(monkeypatch):
     # (pytest will restore sys.modules entries via monkeypatch automatically)
 
 
+@pytest.fixture(autouse=True)
+def run_in_tmp(monkeypatch, tmp_path):
+    """Runs default to ./autogluon_runs/<run_id>; keep them (and the job index) in tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(job_index, "_db_path", None)
+    job_index.init_db(str(tmp_path / "jobs"))
+
+
 # ---------- asyncio helpers ----------
 @pytest.mark.asyncio
 async def test_validate_requires_label_and_data():
@@ -165,3 +174,37 @@ async def test_status_running_then_finished():
     assert st_done["state"] == "finished"
     assert st_done["error"] is None
     assert st_done["active"] is False
+
+
+@pytest.mark.asyncio
+async def test_try_start_rejects_invalid_cfg_without_starting():
+    jr = JobRunner()
+
+    run_id, err = await jr.try_start({"train_df": object()})
+    assert run_id is None and "label" in err.lower()
+
+    run_id, err = await jr.try_start({"label": "y"})
+    assert run_id is None and "training data" in err.lower()
+    assert not jr.is_running
+
+
+@pytest.mark.asyncio
+async def test_try_start_refuses_second_run_while_active():
+    jr = JobRunner()
+    cfg = {"label": "y", "train_df": object()}
+
+    run_id, err = await jr.try_start(cfg)
+    assert isinstance(run_id, str) and err is None
+    assert jr.is_running
+
+    # refused as a value (not RuntimeError like start()); the active run is untouched
+    run_id2, err = await jr.try_start(cfg)
+    assert run_id2 is None and "already in progress" in err
+    st = await jr.status(run_id)
+    assert st["active"] is True
+
+    async def emit(_):  # discard
+        pass
+
+    await asyncio.wait_for(jr.stream_progress(run_id, emit), timeout=5.0)
+    assert not jr.is_running
@@ -0,0 +1,68 @@
+# tests/test_log_parser.py
+import sys
+from pathlib import Path
+
+PARENT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PARENT))
+from autogluon_log_parser import parse_autogluon_log, parse_autogluon_log_file
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "predictor_log.txt"
+
+EXPECTED_SUMMARY = "\n".join([
+    "AutoGluon Tabular run summary",
+    "- Dataset: 39073 rows, 14 cols | label='class' | problem=binary",
+    "- Split: train=35165 | val=3908 | metric=accuracy",
+    "- Features: 14 → 38 processed, processed mem ~7.28 MB",
+    "- Validation scores (top):",
+    "  • WeightedEnsemble_L2: 0.8820 (accuracy), train 0.21s, val 0.0s",
+    "  • LightGBM: 0.8807 (accuracy), train 0.95s, val 0.01s",
+    "  • LightGBMXT: 0.8767 (accuracy), train 1.45s, val 0.02s",
+    "- Best model: WeightedEnsemble_L2",
+    "- Total training runtime: 25.41s",
+    "- Models saved to: /tmp/ag/run1",
+    "- Inference throughput (est): 35123.4 rows/s @ batch 3908",
+    "- Notes:",
+    "  • Disabling decision threshold calibration for metric `accuracy` due to having fewer than 10000 rows of validation data.",
+])
+
+
+def test_parse_fixture_log_file():
+    result = parse_autogluon_log_file(str(FIXTURE))
+
+    assert result["summary"] == EXPECTED_SUMMARY
+    assert result["dataset"] == {"rows": 39073, "cols": 14, "label": "class"}
+    assert result["problem"] == {"type": "binary"}
+    assert result["eval"] == {"metric": "accuracy"}
+    assert result["split"] == {"holdout_frac": 0.1, "train_rows": 35165, "val_rows": 3908}
+    assert result["featuregen"] == {"original_features": 14, "processed_features": 38, "processed_mem_mb": 7.28}
+    assert result["best_model"] == {"name": "WeightedEnsemble_L2"}
+    assert result["runtime"] == {"total_runtime_s": 25.41, "throughput_rows_per_s": 35123.4, "batch_size": 3908}
+    assert result["paths"] == {"model_dir": "/tmp/ag/run1", "predictor_load_path": "/tmp/ag/run1"}
+    # the note is its own line, not the rest of the log after it
+    assert result["notes"] == [
+        "Disabling decision threshold calibration for metric `accuracy` due to having fewer than 10000 rows of validation data."
+    ]
+    assert result["presets"]["alias_maps_to"] == "medium_quality"
+    assert result["system"]["AutoGluon Version"] == "1.1.1"
+    assert result["models"].splitlines()[1].startswith("• LightGBMXT: 0.8767 (accuracy) — train 1.45s, val 0.02s")
+
+
+def test_text_and_file_parsing_agree():
+    # str, bytes and the mmap-backed file path all go through the same byte patterns
+    text = FIXTURE.read_text(encoding="utf-8")
+    from_file = parse_autogluon_log_file(str(FIXTURE))
+    assert parse_autogluon_log(text) == from_file
+    assert parse_autogluon_log(text.encode("utf-8")) == from_file
+
+
+def test_empty_log_file(tmp_path):
+    # mmap can't map a zero-length file; the parser must special-case it
+    empty = tmp_path / "predictor_log.txt"
+    empty.write_bytes(b"")
+    result = parse_autogluon_log_file(str(empty))
+
+    assert result == parse_autogluon_log("")
+    assert result["summary"] == "AutoGluon Tabular run summary"
+    assert result["best_model"] is None
+    assert result["models"] == ""
+    assert result["dataset"] == {"rows": None, "cols": None, "label": None}
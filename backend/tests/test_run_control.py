@@ -1,7 +1,10 @@
 # tests/test_run_control_session.py
 import asyncio
 import json
+import logging
+import struct
 import pytest
+from fastapi.websockets import WebSocketState
 
 # adjust these imports to match your project layout
 from sessions import RunControlSession, SUCCESS_MESSAGE
@@ -9,6 +12,21 @@ from sessions import RunControlSession, SUCCESS_MESSAGE
 
 # --------- Fakes / stubs ---------
 
+def decode_frame(data):
+    """Decode a frame sent by the session: plain JSON, or a framed log event."""
+    if isinstance(data, bytes) and data[:1] == b"\x00":
+        (hlen,) = struct.unpack("!I", data[:4])
+        header = json.loads(data[4:4 + hlen])
+        events = []
+        for rec in data[4 + hlen:].decode("utf-8").split("\x1e"):
+            ts, _, msg = rec.partition("\x1f")
+            events.append({**header, "msg": msg, "ts": float(ts) if ts else None})
+        if len(events) == 1:
+            return events[0]
+        return {"type": "event_batch", "events": events}
+    return json.loads(data)
+
+
 class FakeWebSocket:
     def __init__(self):
         self.sent_texts = []
@@ -25,6 +43,45 @@ class FakeWebSocket:
     async def send_text(self, text: str):
         self.sent_texts.append(text)
 
+    async def send_bytes(self, data: bytes):
+        self.sent_texts.append(data)
+
+
+class ScriptedWebSocket(FakeWebSocket):
+    """Delivers the given text frames to run_loop, then disconnects."""
+    def __init__(self, incoming):
+        super().__init__()
+        self._incoming = list(incoming)
+
+    async def receive(self):
+        if not self._incoming:
+            return {"type": "websocket.disconnect", "code": 1000}
+        return {"type": "websocket.receive", "text": self._incoming.pop(0)}
+
+
+class ClosedAfterAcceptWebSocket(FakeWebSocket):
+    """Client that goes away right after connecting: sends fail like Starlette's do."""
+    def __init__(self):
+        super().__init__()
+        self.application_state = WebSocketState.CONNECTED
+
+    async def accept(self):
+        await super().accept()
+        self.application_state = WebSocketState.DISCONNECTED
+
+    async def send_bytes(self, data: bytes):
+        if self.application_state == WebSocketState.DISCONNECTED:
+            raise RuntimeError('Cannot call "send" once a close message has been sent.')
+        await super().send_bytes(data)
+
+
+_DEFAULT_EVENTS = (
+    {"type": "log", "logger": "autogluon", "level": "info", "msg": "fit: start"},
+    {"type": "milestone", "stage": "fit_begin"},
+    {"type": "log", "logger": "autogluon", "level": "info", "msg": "fit: end"},
+    {"type": "finished", "result_path": "./autogluon_runs/run-stub-1"},
+)
+
 
 class StubJobRunner:
     """A minimal JobRunner stub that emits a fixed list of events and tracks state."""
@@ -36,12 +93,8 @@ class StubJobRunner:
         self.cancelled = False
         self._run_id = "run-stub-1"
         self._state = "idle"
-        self._events = emitted_events or [
-            {"type": "log", "logger": "autogluon", "level": "info", "msg": "fit: start"},
-            {"type": "milestone", "stage": "fit_begin"},
-            {"type": "log", "logger": "autogluon", "level": "info", "msg": "fit: end"},
-            {"type": "finished", "result_path": f"./autogluon_runs/{_run_id if ' _' == 'nope' else 'run-stub-1'}"},
-        ]
+        # shared default; stream_progress copies each event before emitting it
+        self._events = emitted_events or _DEFAULT_EVENTS
 
     async def validate(self, cfg):
         return (self.validate_ok, self.validate_err)
@@ -52,7 +105,15 @@ class StubJobRunner:
         self._state = "running"
         return self._run_id
 
-    async def stream_progress(self, run_id, emit):
+    async def try_start(self, cfg):
+        if self.is_running:
+            return None, "a run is already in progress"
+        ok, err = await self.validate(cfg)
+        if not ok:
+            return None, err
+        return await self.start(cfg), None
+
+    async def stream_progress(self, run_id, emit, emit_batch=None):
         # emit each event, then end (simulate finish)
         for ev in self._events:
             await emit({**ev, "run_id": run_id})
@@ -112,7 +173,7 @@ async def test_start_streams_events_and_clears_curr_run_id():
     assert session.curr_run_id is None
 
     # inspect what was sent to the client
-    sent = [json.loads(s) for s in ws.sent_texts]
+    sent = [decode_frame(s) for s in ws.sent_texts]
     print(sent)
     # all should be normalized with "type":"event" and "subtype" set from payload "type"
     assert all(msg.get("type") == "event" for msg in sent)
@@ -139,8 +200,8 @@ async def test_start_denied_when_runner_already_running():
     await session.on_connect(ws)
 
     resp = await session.dispatch({"action_type": "start", "cfg": {"label": "y", "train_df": object()}})
-    assert resp["status"] == "error"
-    assert "already in progress" in resp["error"]
+    assert resp == {"status": "error", "error": "a run is already in progress"}
+    assert jr.started is False
 
 
 @pytest.mark.asyncio
@@ -198,3 +259,48 @@ async def test_status_and_cancel_paths():
     # call cancel (our stub implements cancel without raising)
     resp = await session.dispatch({"action_type": "cancel", "run_id": run_id})
     assert resp == SUCCESS_MESSAGE
+
+
+@pytest.mark.asyncio
+async def test_stream_stops_quietly_when_client_is_gone(caplog):
+    jr = StubJobRunner()
+    session = RunControlSession(jr)
+    ws = ClosedAfterAcceptWebSocket()
+    await session.on_connect(ws)
+
+    with caplog.at_level(logging.DEBUG):
+        resp = await session.dispatch({"action_type": "start", "cfg": {"label": "y", "train_df": object()}})
+        assert resp["status"] == "success"
+        await asyncio.wait_for(session._writer, timeout=1.0)
+
+    # the writer ends on its own, without a traceback, and the run is no longer tracked
+    assert session._writer.exception() is None
+    assert session.curr_run_id is None
+    assert ws.sent_texts == []
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+
+
+@pytest.mark.asyncio
+async def test_unknown_action_type_gets_error_reply():
+    session = RunControlSession(StubJobRunner())
+    ws = ScriptedWebSocket([
+        '{"action_type": "bogus"}',
+        '{"run_id": "x"}',
+        '{"action_type": ["start"]}',
+        '{"action_type": "start"}',
+        '{"action_type": "status", "run_id": 5}',
+    ])
+    await session.run_loop(ws)
+
+    sent = [decode_frame(s) for s in ws.sent_texts]
+    assert sent[0] == {"status": "error", "error": "unknown action_type=bogus"}
+    assert sent[1] == {"status": "error", "error": "unknown action_type="}
+    assert sent[2] == {"status": "error", "error": "unknown action_type=['start']"}
+    # a known action with a bad body is still rejected by the schema
+    assert sent[3]["type"] == "error" and sent[3]["code"] == "bad_message"
+    assert sent[4]["type"] == "error" and sent[4]["code"] == "bad_message"
+
+    resp = await session.dispatch({"action_type": "bogus"})
+    assert resp == {"status": "error", "error": "unknown action_type=bogus"}
+    resp = await session.dispatch({"action_type": "cancel", "run_id": 5})
+    assert resp["status"] == "error" and resp["error"].startswith("invalid message:")